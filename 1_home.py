@@ -1,61 +1,62 @@
-import pandas as pd
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-excel_file = None
-df_years = []
-
+from finance import currency, data, ledger, perfil, tendencia
 
-@st.cache_resource(show_spinner="Loading data...", ttl=3600)
-def load_excel_data():
-    return pd.ExcelFile("data/data.xlsx")
+# Time spent in each stage of this run (sidebar panel with FINANCE_TIMINGS=1)
+perfil.start(__file__)
 
+snapshot = None
+ledger_df = None
+kpi_table = None
+df_years = []
 
-excel_file = load_excel_data()
-st.session_state.excel_file = excel_file
+perfil.switch("carregar")
+snapshot = data.ledger_snapshot()
+st.session_state.ledger_snapshot = snapshot
 
-if excel_file is not None:
-    year_from_excel = excel_file.sheet_names
-    df_years = [
-        year for year in year_from_excel if any(str(num).isdigit() for num in year)
-    ]
+if snapshot is not None:
+    # Every month sheet is read once per data version into a single long frame,
+    # and the monthly KPIs are materialized once per version as well
+    ledger_df = data.load_ledger_frame(snapshot["version"], snapshot)
+    kpi_table = data.load_kpi_table(snapshot["version"], snapshot)
+    df_years = ledger.period_names(snapshot)
 
+perfil.switch("transformar")
 st.sidebar.title("Menu")
 period_selected = st.sidebar.selectbox("Select a period", df_years)
 period_index = df_years.index(period_selected)
 period_selected_minus_1 = str(period_index - 1)
-print(f"Selected period index: {period_index}")
 
 # Get specific items from df_years using index
 if period_index > 0:
     previous_period = df_years[period_index - 1]  # Get previous period
-    print(f"Previous period: {previous_period}")
 
 current_period = df_years[period_index]  # Get current period
-print(f"Current period: {current_period}")
 
 if period_index < len(df_years) - 1:
     next_period = df_years[period_index + 1]  # Get next period
-    print(f"Next period: {next_period}")
 
 st.title(f"Data Analysis for {period_selected}")
-# st.dataframe(excel_file.parse(period_selected))
+# st.dataframe(ledger_df[ledger_df["Periodo"] == period_selected])
 
-df = pd.read_excel(excel_file, sheet_name=period_selected)
-total_incomes = df["Rendimento"].sum()
-total_bills = df[df["Valor"].notna()]["Valor"].sum()
-total_paid_bills = df[df["Pago"] == "Sim"]["Valor"].sum()
+df = ledger_df[ledger_df["Periodo"] == period_selected]
+
+perfil.switch("agregar")
+# Switching periods is just a row lookup in the KPI table
+current_kpis = kpi_table.loc[period_selected]
+total_incomes = current_kpis["Renda"]
+total_bills = current_kpis["Despesa"]
+total_paid_bills = current_kpis["Bills Pagas"]
 
-print(total_incomes)
 # Calculate delta for income comparison
 income_delta = 0
 bills_delta = 0
 if period_index > 0:
-    df_previous = pd.read_excel(excel_file, sheet_name=previous_period)
-    previous_incomes = df_previous["Rendimento"].sum()
-    previous_bills = df_previous[df_previous["Valor"].notna()]["Valor"].sum()
+    previous_incomes = kpi_table.loc[previous_period, "Renda"]
+    previous_bills = kpi_table.loc[previous_period, "Despesa"]
     income_delta = (
         ((total_incomes - previous_incomes) / previous_incomes * 100)
         if previous_incomes > 0
@@ -67,13 +68,10 @@ if period_index > 0:
         else 0
     )
 
-print(total_paid_bills)
-
+perfil.switch("renderizar")
 col1, col2 = st.columns(2)
 with col1:
     # Green for income increase, red for decrease
-    print(income_delta >= 0)
-
     st.metric(
         "Renda Total",
         f"R$ {total_incomes:,.2f}",
@@ -89,22 +87,16 @@ with col2:
         delta_color="inverse",
     )
 
-# Calculate savings
-total_savings = total_incomes - total_bills
-savings_rate = (total_savings / total_incomes * 100) if total_incomes > 0 else 0
+# Savings
+total_savings = current_kpis["Economia"]
+savings_rate = current_kpis["Taxa de Economia (%)"]
 
-# Calculate credit card expenses
-credit_card_keywords = ['card', 'cartão', 'itau', 'pedralli', 'caixa', 'nubank', 'santander', 'bradesco']
-credit_card_expenses = df[
-    df['Finalidade'].notna() & 
-    df['Valor'].notna() & 
-    df['Finalidade'].str.lower().str.contains('|'.join(credit_card_keywords), na=False)
-]['Valor'].sum()
+# Credit card expenses
+credit_card_expenses = current_kpis["Gastos Cartão"]
+credit_card_percentage = current_kpis["Percentual Cartão (%)"]
 
-credit_card_percentage = (credit_card_expenses / total_bills * 100) if total_bills > 0 else 0
-
-# Calculate remaining expenses (non-credit card)
-other_expenses = total_bills - credit_card_expenses
+# Remaining expenses (non-credit card)
+other_expenses = current_kpis["Outras Despesas"]
 other_percentage = (other_expenses / total_bills * 100) if total_bills > 0 else 0
 
 # Add savings metric
@@ -120,7 +112,7 @@ with col4:
     st.metric(
         "Bills Pagas",
         f"R$ {total_paid_bills:,.2f}",
-        delta=f"{(total_paid_bills/total_bills*100):.1f}% das despesas" if total_bills > 0 else "0%",
+        delta=f"{current_kpis['Percentual Pagas (%)']:.1f}% das despesas" if total_bills > 0 else "0%",
         delta_color="normal",
     )
 
@@ -145,119 +137,132 @@ with col6:
 st.markdown("---")
 st.subheader("📊 Análise Visual")
 
+# Figures are cached by data version and only the inputs each chart depends on,
+# so a rerun that doesn't change them reuses the figures already built
+period_key = (snapshot["version"], period_selected)
+
 # 1. Income vs Expenses Bar Chart
-fig_bar = go.Figure()
-fig_bar.add_trace(go.Bar(
-    x=['Renda', 'Despesa'],
-    y=[total_incomes, total_bills],
-    marker_color=['#00ff88', '#ff6b6b'],
-    text=[f'R$ {total_incomes:,.0f}', f'R$ {total_bills:,.0f}'],
-    textposition='auto',
-    name='Valores'
-))
-
-fig_bar.update_layout(
-    title='Renda vs Despesa',
-    xaxis_title='Categoria',
-    yaxis_title='Valor (R$)',
-    height=400,
-    showlegend=False
-)
+def build_fig_bar():
+    fig_bar = go.Figure()
+    fig_bar.add_trace(go.Bar(
+        x=['Renda', 'Despesa'],
+        y=[total_incomes, total_bills],
+        marker_color=['#00ff88', '#ff6b6b'],
+        text=[f'R$ {total_incomes:,.0f}', f'R$ {total_bills:,.0f}'],
+        textposition='auto',
+        name='Valores'
+    ))
+
+    fig_bar.update_layout(
+        title='Renda vs Despesa',
+        xaxis_title='Categoria',
+        yaxis_title='Valor (R$)',
+        height=400,
+        showlegend=False
+    )
+    return fig_bar
+
+fig_bar = data.figure('home_income_vs_expenses', period_key, build_fig_bar)
 
 st.plotly_chart(fig_bar, use_container_width=True)
 
 # 2. Expense Breakdown (if category data exists)
 if 'Categoria' in df.columns or 'Category' in df.columns:
     category_col = 'Categoria' if 'Categoria' in df.columns else 'Category'
-    expense_by_category = df[df['Valor'].notna()].groupby(category_col)['Valor'].sum().sort_values(ascending=False)
+    def build_fig_pie():
+        expense_by_category = currency.to_reais(df[df['Valor'].notna()].groupby(category_col)['Valor'].sum()).sort_values(ascending=False)
     
-    fig_pie = px.pie(
-        values=expense_by_category.values,
-        names=expense_by_category.index,
-        title='Despesas por Categoria'
-    )
-    fig_pie.update_layout(height=400)
+        fig_pie = px.pie(
+            values=expense_by_category.values,
+            names=expense_by_category.index,
+            title='Despesas por Categoria'
+        )
+        fig_pie.update_layout(height=400)
+        return fig_pie
+
+    fig_pie = data.figure('home_expenses_by_category', period_key, build_fig_pie)
     st.plotly_chart(fig_pie, use_container_width=True)
 
 # 3. Paid vs Unpaid Bills
-paid_bills = df[df['Pago'] == 'Sim']['Valor'].sum()
-unpaid_bills = df[df['Pago'] != 'Sim']['Valor'].sum()
-
-fig_paid = go.Figure(data=[go.Pie(
-    labels=['Pagas', 'Não Pagas'],
-    values=[paid_bills, unpaid_bills],
-    marker_colors=['#00ff88', '#ff6b6b']
-)])
-fig_paid.update_layout(
-    title='Status dos Pagamentos',
-    height=400
-)
+paid_bills = current_kpis["Bills Pagas"]
+unpaid_bills = current_kpis["Não Pagas"]
+
+def build_fig_paid():
+    fig_paid = go.Figure(data=[go.Pie(
+        labels=['Pagas', 'Não Pagas'],
+        values=[paid_bills, unpaid_bills],
+        marker_colors=['#00ff88', '#ff6b6b']
+    )])
+    fig_paid.update_layout(
+        title='Status dos Pagamentos',
+        height=400
+    )
+    return fig_paid
+
+fig_paid = data.figure('home_paid_bills', period_key, build_fig_paid)
 st.plotly_chart(fig_paid, use_container_width=True)
 
 # 3.5 Credit Card vs Other Expenses
-fig_credit = go.Figure(data=[go.Pie(
-    labels=['Cartão de Crédito', 'Outras Despesas'],
-    values=[credit_card_expenses, other_expenses],
-    marker_colors=['#ff6b6b', '#4ecdc4'],
-    textinfo='label+percent+value',
-    texttemplate='%{label}<br>R$ %{value:,.0f}<br>(%{percent:.1%})'
-)])
-fig_credit.update_layout(
-    title='Distribuição: Cartão vs Outras Despesas',
-    height=400
-)
+def build_fig_credit():
+    fig_credit = go.Figure(data=[go.Pie(
+        labels=['Cartão de Crédito', 'Outras Despesas'],
+        values=[credit_card_expenses, other_expenses],
+        marker_colors=['#ff6b6b', '#4ecdc4'],
+        textinfo='label+percent+value',
+        texttemplate='%{label}<br>R$ %{value:,.0f}<br>(%{percent:.1%})'
+    )])
+    fig_credit.update_layout(
+        title='Distribuição: Cartão vs Outras Despesas',
+        height=400
+    )
+    return fig_credit
+
+fig_credit = data.figure('home_credit_vs_other', period_key, build_fig_credit)
 st.plotly_chart(fig_credit, use_container_width=True)
 
 # 4. Financial Trend (if multiple periods available)
 if len(df_years) > 1:
     st.subheader("📈 Tendência Financeira")
     
-    # Get data for last 5 periods (or all if less than 5)
-    periods_to_show = df_years[-5:] if len(df_years) > 5 else df_years
-    
-    trend_data = []
-    for period in periods_to_show:
-        period_df = pd.read_excel(excel_file, sheet_name=period)
-        income = period_df['Rendimento'].sum()
-        expenses = period_df[period_df['Valor'].notna()]['Valor'].sum()
-        trend_data.append({
-            'Periodo': period,
-            'Renda': income,
-            'Despesa': expenses,
-            'Economia': income - expenses
-        })
+    # The KPI table already holds every period, so the trend covers the full history;
+    # long histories are drawn with WebGL and reduced on the server (finance/tendencia.py)
+    periods_to_show = df_years
     
-    trend_df = pd.DataFrame(trend_data)
+    def build_fig_trend():
+        trend_df = kpi_table.loc[periods_to_show, ['Renda', 'Despesa', 'Economia']].rename_axis('Periodo').reset_index()
     
-    fig_trend = go.Figure()
-    fig_trend.add_trace(go.Scatter(
-        x=trend_df['Periodo'],
-        y=trend_df['Renda'],
-        mode='lines+markers',
-        name='Renda',
-        line=dict(color='#00ff88', width=3)
-    ))
-    fig_trend.add_trace(go.Scatter(
-        x=trend_df['Periodo'],
-        y=trend_df['Despesa'],
-        mode='lines+markers',
-        name='Despesa',
-        line=dict(color='#ff6b6b', width=3)
-    ))
-    fig_trend.add_trace(go.Scatter(
-        x=trend_df['Periodo'],
-        y=trend_df['Economia'],
-        mode='lines+markers',
-        name='Economia',
-        line=dict(color='#4ecdc4', width=3)
-    ))
+        fig_trend = go.Figure()
+        fig_trend.add_trace(tendencia.line(
+            trend_df['Periodo'],
+            trend_df['Renda'],
+            mode='lines+markers',
+            name='Renda',
+            line=dict(color='#00ff88', width=3)
+        ))
+        fig_trend.add_trace(tendencia.line(
+            trend_df['Periodo'],
+            trend_df['Despesa'],
+            mode='lines+markers',
+            name='Despesa',
+            line=dict(color='#ff6b6b', width=3)
+        ))
+        fig_trend.add_trace(tendencia.line(
+            trend_df['Periodo'],
+            trend_df['Economia'],
+            mode='lines+markers',
+            name='Economia',
+            line=dict(color='#4ecdc4', width=3)
+        ))
     
-    fig_trend.update_layout(
-        title='Evolução Financeira',
-        xaxis_title='Período',
-        yaxis_title='Valor (R$)',
-        height=400
-    )
+        fig_trend.update_layout(
+            title='Evolução Financeira',
+            xaxis_title='Período',
+            yaxis_title='Valor (R$)',
+            height=400
+        )
+        return fig_trend
+
+    fig_trend = data.figure('home_trend', snapshot["version"], build_fig_trend)
     
     st.plotly_chart(fig_trend, use_container_width=True)
 
@@ -265,88 +270,85 @@ if len(df_years) > 1:
 if len(df_years) > 1:
     st.subheader("💳 Tendência dos Gastos com Cartão")
     
-    credit_trend_data = []
-    for period in periods_to_show:
-        period_df = pd.read_excel(excel_file, sheet_name=period)
-        period_credit_expenses = period_df[
-            period_df['Finalidade'].notna() & 
-            period_df['Valor'].notna() & 
-            period_df['Finalidade'].str.lower().str.contains('|'.join(credit_card_keywords), na=False)
-        ]['Valor'].sum()
-        
-        period_total_expenses = period_df[period_df['Valor'].notna()]['Valor'].sum()
-        credit_percentage = (period_credit_expenses / period_total_expenses * 100) if period_total_expenses > 0 else 0
-        
-        credit_trend_data.append({
-            'Periodo': period,
-            'Gastos_Cartao': period_credit_expenses,
-            'Percentual': credit_percentage
-        })
-    
-    credit_trend_df = pd.DataFrame(credit_trend_data)
+    def build_fig_credit_trend():
+        credit_trend_df = (
+            kpi_table.loc[periods_to_show, ['Gastos Cartão', 'Percentual Cartão (%)']]
+            .rename(columns={'Gastos Cartão': 'Gastos_Cartao', 'Percentual Cartão (%)': 'Percentual'})
+            .rename_axis('Periodo')
+            .reset_index()
+        )
     
-    # Create subplot for credit card trend
-    fig_credit_trend = make_subplots(
-        rows=2, cols=1,
-        subplot_titles=('Gastos com Cartão (R$)', 'Percentual do Total (%)'),
-        vertical_spacing=0.1
-    )
+        # Create subplot for credit card trend
+        fig_credit_trend = make_subplots(
+            rows=2, cols=1,
+            subplot_titles=('Gastos com Cartão (R$)', 'Percentual do Total (%)'),
+            vertical_spacing=0.1
+        )
     
-    # Bar chart for credit card expenses
-    fig_credit_trend.add_trace(
-        go.Bar(
-            x=credit_trend_df['Periodo'],
-            y=credit_trend_df['Gastos_Cartao'],
-            name='Gastos com Cartão',
-            marker_color='#ff6b6b'
-        ),
-        row=1, col=1
-    )
+        # Bar chart for credit card expenses
+        fig_credit_trend.add_trace(
+            go.Bar(
+                x=credit_trend_df['Periodo'],
+                y=credit_trend_df['Gastos_Cartao'],
+                name='Gastos com Cartão',
+                marker_color='#ff6b6b'
+            ),
+            row=1, col=1
+        )
     
-    # Line chart for percentage
-    fig_credit_trend.add_trace(
-        go.Scatter(
-            x=credit_trend_df['Periodo'],
-            y=credit_trend_df['Percentual'],
-            mode='lines+markers',
-            name='% do Total',
-            line=dict(color='#ff6b6b', width=3)
-        ),
-        row=2, col=1
-    )
+        # Line chart for percentage
+        fig_credit_trend.add_trace(
+            tendencia.line(
+                credit_trend_df['Periodo'],
+                credit_trend_df['Percentual'],
+                mode='lines+markers',
+                name='% do Total',
+                line=dict(color='#ff6b6b', width=3)
+            ),
+            row=2, col=1
+        )
     
-    fig_credit_trend.update_layout(
-        height=500,
-        showlegend=False
-    )
+        fig_credit_trend.update_layout(
+            height=500,
+            showlegend=False
+        )
     
-    fig_credit_trend.update_yaxes(title_text="Valor (R$)", row=1, col=1)
-    fig_credit_trend.update_yaxes(title_text="Percentual (%)", row=2, col=1)
+        fig_credit_trend.update_yaxes(title_text="Valor (R$)", row=1, col=1)
+        fig_credit_trend.update_yaxes(title_text="Percentual (%)", row=2, col=1)
+        return fig_credit_trend
+
+    fig_credit_trend = data.figure('home_credit_trend', snapshot["version"], build_fig_credit_trend)
     
     st.plotly_chart(fig_credit_trend, use_container_width=True)
 
 # 5. Savings Rate Gauge
-fig_gauge = go.Figure(go.Indicator(
-    mode = "gauge+number+delta",
-    value = savings_rate,
-    domain = {'x': [0, 1], 'y': [0, 1]},
-    title = {'text': "Taxa de Economia (%)"},
-    delta = {'reference': 20},  # 20% is a good savings rate
-    gauge = {
-        'axis': {'range': [None, 100]},
-        'bar': {'color': "darkblue"},
-        'steps': [
-            {'range': [0, 10], 'color': "lightgray"},
-            {'range': [10, 20], 'color': "yellow"},
-            {'range': [20, 100], 'color': "green"}
-        ],
-        'threshold': {
-            'line': {'color': "red", 'width': 4},
-            'thickness': 0.75,
-            'value': 90
+def build_fig_gauge():
+    fig_gauge = go.Figure(go.Indicator(
+        mode = "gauge+number+delta",
+        value = savings_rate,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "Taxa de Economia (%)"},
+        delta = {'reference': 20},  # 20% is a good savings rate
+        gauge = {
+            'axis': {'range': [None, 100]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, 10], 'color': "lightgray"},
+                {'range': [10, 20], 'color': "yellow"},
+                {'range': [20, 100], 'color': "green"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 90
+            }
         }
-    }
-))
+    ))
 
-fig_gauge.update_layout(height=300)
+    fig_gauge.update_layout(height=300)
+    return fig_gauge
+
+fig_gauge = data.figure('home_savings_gauge', period_key, build_fig_gauge)
 st.plotly_chart(fig_gauge, use_container_width=True)
+
+data.show_timings(perfil.finish())
@@ -0,0 +1 @@
+"""Benchmarks do app; execute com `python -m benchmarks.<nome>` a partir da raiz do projeto."""
@@ -0,0 +1,67 @@
+"""Benchmark da conversão da coluna Valor das faturas.
+
+Compara finance/currency.parse_brl com o .astype(str).apply(normaliza_valor)
+que as páginas usavam, sobre uma coluna de valores no formato dos CSV.
+
+Uso: python -m benchmarks.bench_currency --rows 100000
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from finance import currency, parsing
+
+
+def synthetic_values(n, seed=0):
+    """Gera valores como aparecem nos CSV ("1.234,56", "R$ 7,99", "-7,99", "1.374")"""
+    rng = random.Random(seed)
+    valores = []
+    for _ in range(n):
+        reais = rng.randint(0, 5000)
+        centavos = rng.randint(0, 99)
+        texto = f"{reais:,}".replace(",", ".")
+        formato = rng.random()
+        if formato < 0.6:
+            texto = f"{texto},{centavos:02d}"
+        elif formato < 0.8:
+            texto = f"R$ {texto},{centavos:02d}"
+        elif formato < 0.9:
+            texto = f"-{texto},{centavos:02d}"
+        valores.append(texto)
+    return pd.Series(valores, dtype=object)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    valores = synthetic_values(args.rows, args.seed)
+
+    start = time.perf_counter()
+    antigo = valores.astype(str).apply(parsing.normaliza_valor).astype(float)
+    tempo_apply = time.perf_counter() - start
+
+    start = time.perf_counter()
+    novo, suspeitos = currency.parse_brl(valores)
+    tempo_vetorizado = time.perf_counter() - start
+
+    assert np.array_equal(antigo.to_numpy(), novo.to_numpy())
+
+    print(f"{len(valores)} valores ({valores.nunique()} distintos)")
+    for nome, segundos in (("apply", tempo_apply), ("vetorizado", tempo_vetorizado)):
+        print(
+            f"{nome:<12} {segundos * 1000:10.1f} ms  "
+            f"{len(valores) / segundos:12.0f} valores/s  "
+            f"{tempo_apply / segundos:6.1f}x"
+        )
+    print(f"{int(suspeitos.sum())} valores suspeitos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Benchmark da ingestão das faturas (CSV, PDF e o caminho alternativo).
+
+Gera faturas sintéticas (benchmarks/synthetic_statements.py) num diretório
+temporário e mede, com páginas, linhas e transações por segundo:
+
+- CSV: faturas.parse_csv de cada arquivo;
+- PDF texto: o page.extract_text() do pdfplumber (pdf_pages.extract_pages);
+- PDF linhas: parsing.parse_statement_pages sobre o texto já extraído;
+- alternativa: parsing.extract_transactions_alternative em todas as linhas
+  (o caminho das faturas sem Titular/Cartão);
+- sincronização: faturas.sync_faturas a frio mais faturas.load_pieces, o que
+  data.credit_card_data() faz quando todas as faturas são novas.
+
+Uso: python -m benchmarks.bench_ingestion --pdfs 24 --pages 6 --json ingestao.json
+"""
+
+import argparse
+import os
+import tempfile
+
+from benchmarks import resultados, synthetic_statements
+from finance import faturas, parsing, pdf_pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdfs", type=int, default=12)
+    parser.add_argument("--csvs", type=int, default=12)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--lines", type=int, default=40, help="linhas por página")
+    parser.add_argument("--rows", type=int, default=2000, help="linhas por CSV")
+    parser.add_argument(
+        "--fallback", type=float, default=0.25, help="fração de PDFs sem cabeçalho"
+    )
+    parser.add_argument("--workers", type=int, default=pdf_pages.INGEST_WORKERS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="arquivo para gravar os resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        faturas_dir = os.path.join(pasta, "faturas")
+        caminhos = synthetic_statements.write_corpus(
+            faturas_dir,
+            args.pdfs,
+            args.csvs,
+            args.pages,
+            args.lines,
+            args.rows,
+            args.fallback,
+            args.seed,
+        )
+        csvs = [caminho for caminho in caminhos if caminho.endswith(".csv")]
+        pdfs = [caminho for caminho in caminhos if caminho.endswith(".pdf")]
+        etapas = {}
+
+        tempos, frames = resultados.measure(
+            lambda: [faturas.parse_csv(caminho)[0] for caminho in csvs], args.repeat
+        )
+        etapas["CSV"] = resultados.throughput(
+            tempos,
+            linhas=args.rows * len(csvs),
+            transacoes=sum(len(df) for df in frames),
+        )
+
+        tempos, textos = resultados.measure(
+            lambda: {caminho: pdf_pages.extract_pages(caminho) for caminho in pdfs},
+            args.repeat,
+        )
+        paginas = sum(len(texto) for texto in textos.values())
+        linhas = [
+            linha
+            for texto in textos.values()
+            for pagina in texto
+            if pagina
+            for linha in pagina.split("\n")
+        ]
+        etapas["PDF texto"] = resultados.throughput(tempos, paginas=paginas)
+
+        def parse_pdfs():
+            return [
+                parsing.parse_statement_pages(
+                    texto, os.path.basename(caminho), "janeiro", 2024
+                )
+                for caminho, texto in textos.items()
+            ]
+
+        tempos, extraidas = resultados.measure(parse_pdfs, args.repeat)
+        etapas["PDF linhas"] = resultados.throughput(
+            tempos,
+            paginas=paginas,
+            linhas=len(linhas),
+            transacoes=sum(len(rows) for rows, _ in extraidas),
+        )
+        # Faturas que caíram no caminho alternativo (sem Titular/Cartão)
+        etapas["PDF linhas"]["arquivos_alternativa"] = sum(
+            alternativa for _, alternativa in extraidas
+        )
+
+        def alternativa():
+            return sum(
+                len(
+                    parsing.extract_transactions_alternative(
+                        linha, "fatura_janeiro_visa.pdf", "janeiro", 2024
+                    )
+                )
+                for linha in linhas
+            )
+
+        tempos, transacoes = resultados.measure(alternativa, args.repeat)
+        etapas["alternativa"] = resultados.throughput(
+            tempos, linhas=len(linhas), transacoes=transacoes
+        )
+
+        # Cada sincronização começa com um cache vazio, como na primeira carga
+        caches = iter(range(args.repeat))
+
+        def sincroniza():
+            cache_dir = os.path.join(pasta, f"cache-{next(caches)}")
+            manifest = faturas.sync_faturas(
+                faturas_dir,
+                cache_dir,
+                args.workers,
+                metrics_dir=os.path.join(cache_dir, "metrics"),
+            )
+            return faturas.load_pieces(manifest, cache_dir)
+
+        tempos, pecas = resultados.measure(sincroniza, args.repeat)
+        etapas["sincronização"] = resultados.throughput(
+            tempos,
+            arquivos=len(caminhos),
+            paginas=paginas,
+            transacoes=sum(len(df) for df in pecas),
+        )
+
+    documento = resultados.report(
+        "ingestion",
+        {
+            "pdfs": args.pdfs,
+            "csvs": args.csvs,
+            "pages": args.pages,
+            "lines_per_page": args.lines,
+            "csv_rows": args.rows,
+            "fallback": args.fallback,
+            "workers": args.workers,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        etapas,
+    )
+    resultados.write(documento, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark da carga da planilha e dos indicadores das páginas 1 e 2.
+
+Gera uma planilha sintética (benchmarks/synthetic_ledger.py) num diretório
+temporário e mede as etapas por que as páginas passam: a carga fria (hash
+das abas e conversão para Parquet), a carga quente (só o manifesto), a
+montagem do frame longo, a tabela de KPIs, as consultas por período e o
+gráfico de tendência de todo o histórico, até o JSON enviado ao navegador.
+
+Uso: python -m benchmarks.bench_ledger --sheets 120 --rows 500 --json ledger.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+import plotly.graph_objects as go
+import plotly.utils
+
+from benchmarks import resultados, synthetic_ledger
+from finance import currency, ledger, tendencia
+
+
+def trend_figure(kpi_table):
+    """Figura de tendência da página inicial para todos os períodos, serializada"""
+    trend_df = (
+        kpi_table[["Renda", "Despesa", "Economia"]].rename_axis("Periodo").reset_index()
+    )
+    fig = go.Figure()
+    for coluna in ("Renda", "Despesa", "Economia"):
+        fig.add_trace(
+            tendencia.line(
+                trend_df["Periodo"], trend_df[coluna], mode="lines+markers", name=coluna
+            )
+        )
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=60)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="arquivo para gravar os resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        planilha = os.path.join(pasta, "data.xlsx")
+        tamanho = synthetic_ledger.write_workbook(
+            planilha, args.sheets, args.rows, args.seed
+        )
+        etapas = {}
+
+        # Cada carga fria começa com um diretório de snapshot vazio
+        snapshots = iter(range(args.repeat))
+        metrics_dir = os.path.join(pasta, "metrics")
+        tempos, manifest = resultados.measure(
+            lambda: ledger.sync_snapshot(
+                planilha,
+                os.path.join(pasta, f"snapshot-{next(snapshots)}"),
+                metrics_dir=metrics_dir,
+            ),
+            args.repeat,
+        )
+        snapshot_dir = os.path.join(pasta, f"snapshot-{args.repeat - 1}")
+        etapas["carga fria"] = resultados.summary(tempos, abas=args.sheets)
+
+        tempos, _ = resultados.measure(
+            lambda: ledger.sync_snapshot(
+                planilha, snapshot_dir, metrics_dir=metrics_dir
+            ),
+            args.repeat,
+        )
+        etapas["carga quente"] = resultados.summary(tempos)
+
+        tempos, frame = resultados.measure(
+            lambda: ledger.build_ledger_frame(manifest, snapshot_dir), args.repeat
+        )
+        etapas["frame longo"] = resultados.summary(tempos, linhas=len(frame))
+
+        tempos, kpi_table = resultados.measure(
+            lambda: ledger.build_kpi_table(frame), args.repeat
+        )
+        etapas["tabela de KPIs"] = resultados.summary(tempos)
+
+        # Página 1: a linha de um período; página 2: a janela de até três meses
+        periodos = ledger.period_names(manifest)
+
+        def por_periodo():
+            for k, periodo in enumerate(periodos):
+                kpi_table.loc[periodo]
+                kpi_table.loc[periodos[max(k - 2, 0) : k + 1]]
+
+        tempos, _ = resultados.measure(por_periodo, args.repeat)
+        etapas["KPIs por período"] = resultados.summary(
+            tempos, consultas=2 * len(periodos)
+        )
+
+        tempos, spec = resultados.measure(lambda: trend_figure(kpi_table), args.repeat)
+        etapas["tendência"] = resultados.summary(tempos, bytes_json=len(spec))
+
+    documento = resultados.report(
+        "ledger",
+        {
+            "sheets": args.sheets,
+            "rows": args.rows,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "workbook_bytes": tamanho,
+            "cents_mode": currency.CENTS_MODE,
+        },
+        etapas,
+    )
+    resultados.write(documento, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark das colunas de parcelamento das faturas.
+
+Compara finance/parcelas.add_columns com o código que as páginas usavam: três
+varreduras da coluna Parcela (str.contains e dois str.extract) e o Valor_Total
+calculado com apply(axis=1).
+
+Uso: python -m benchmarks.bench_parcelas --rows 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from finance import parcelas
+
+
+def synthetic_frame(n, seed=0):
+    """Transações com 30% de compras parceladas ("03 de 10") e o resto à vista ("-")"""
+    rng = np.random.default_rng(seed)
+    total = rng.integers(2, 13, n)
+    atual = rng.integers(1, 13, n) % total + 1
+    parcelada = rng.random(n) < 0.3
+    parcela = np.where(
+        parcelada,
+        pd.Series(atual).map("{:02d}".format)
+        + " de "
+        + pd.Series(total).map("{:02d}".format),
+        "-",
+    )
+    return pd.DataFrame(
+        {"Valor": rng.integers(100, 500000, n) / 100, "Parcela": parcela}
+    )
+
+
+def old_columns(df):
+    """Código anterior das páginas"""
+    df["É_Parcelado"] = df["Parcela"].str.contains(r"\d+ de \d+", na=False)
+    df["Parcela_Atual"] = df["Parcela"].str.extract(r"(\d+) de \d+").astype(float)
+    df["Total_Parcelas"] = df["Parcela"].str.extract(r"\d+ de (\d+)").astype(float)
+    df["Valor_Total"] = df.apply(
+        lambda row: (
+            row["Valor"] * row["Total_Parcelas"]
+            if pd.notna(row["Total_Parcelas"])
+            else row["Valor"]
+        ),
+        axis=1,
+    )
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows, args.seed)
+
+    start = time.perf_counter()
+    antigo = old_columns(df.copy())
+    tempo_apply = time.perf_counter() - start
+
+    start = time.perf_counter()
+    novo = parcelas.add_columns(df.copy())
+    tempo_vetorizado = time.perf_counter() - start
+
+    for coluna in ["É_Parcelado", "Parcela_Atual", "Total_Parcelas", "Valor_Total"]:
+        assert np.array_equal(
+            antigo[coluna].to_numpy(dtype=float),
+            novo[coluna].to_numpy(dtype=float, na_value=np.nan),
+            equal_nan=True,
+        ), coluna
+
+    print(f"{len(df)} transações ({int(novo['É_Parcelado'].sum())} parceladas)")
+    for nome, segundos in (("apply", tempo_apply), ("vetorizado", tempo_vetorizado)):
+        print(
+            f"{nome:<12} {segundos:8.3f} s  "
+            f"{len(df) / segundos:12.0f} linhas/s  "
+            f"{tempo_apply / segundos:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
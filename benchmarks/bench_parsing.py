@@ -0,0 +1,101 @@
+"""Benchmark do parser de linhas das faturas PDF.
+
+Compara o parser puro de finance/parsing.py com a mesma função decorada com
+st.cache_data linha a linha (como as páginas faziam antes), para mostrar o
+custo de hashear, serializar e guardar cada linha no cache do Streamlit.
+
+Uso: python -m benchmarks.bench_parsing --lines 20000
+"""
+
+import argparse
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+from finance import parsing
+
+ESTABELECIMENTOS = [
+    "APPLE.COM/BILL",
+    "UBER* TRIP",
+    "SUPERMERCADO BIG",
+    "POSTO SHELL",
+    "AMAZON BR",
+    "RENNER MODAS",
+    "FARMACIA SAO JOAO",
+    "PADARIA PAO QUENTE",
+]
+RUIDO = [
+    "Total da fatura anterior 1.234,56",
+    "Lançamentos no cartão",
+    "Saldo financiado 0,00",
+    "Limite disponível 5.000,00",
+]
+
+
+def synthetic_lines(n, seed=0):
+    """Gera linhas no formato do texto extraído das faturas Itaú"""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(n):
+        if rng.random() < 0.15:
+            lines.append(rng.choice(RUIDO))
+            continue
+        data = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}"
+        valor = f"{rng.randint(1, 2000)},{rng.randint(0, 99):02d}"
+        lines.append(f"{data} {rng.choice(ESTABELECIMENTOS)} {valor}")
+    return lines
+
+
+@contextmanager
+def per_line_cache():
+    """Reproduz o parser antigo: st.cache_data em cada função chamada por linha"""
+    originais = (parsing.extract_transactions, parsing.normaliza_valor)
+    parsing.normaliza_valor = st.cache_data(originais[1])
+    try:
+        yield st.cache_data(originais[0])
+    finally:
+        parsing.extract_transactions, parsing.normaliza_valor = originais
+
+
+def run(extract, lines):
+    """Tempo (s) e número de transações extraídas de todas as linhas"""
+    start = time.perf_counter()
+    total = 0
+    for line in lines:
+        total += len(
+            extract(line, "JORGE LEITE", "1234", "fatura_jan_visa.pdf", "jan", 2024)
+        )
+    return time.perf_counter() - start, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Fora do `streamlit run` o cache avisa a cada função decorada
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    lines = synthetic_lines(args.lines, args.seed)
+    resultados = {"puro": run(parsing.extract_transactions, lines)}
+    with per_line_cache() as cached_extract:
+        resultados["st.cache_data (frio)"] = run(cached_extract, lines)
+        resultados["st.cache_data (quente)"] = run(cached_extract, lines)
+
+    print(f"{len(lines)} linhas")
+    base = resultados["puro"][0]
+    for nome, (segundos, transacoes) in resultados.items():
+        por_linha = segundos / len(lines) * 1e6
+        print(
+            f"{nome:<24} {segundos:8.3f} s  {por_linha:8.1f} µs/linha  "
+            f"{len(lines) / segundos:10.0f} linhas/s  {segundos / base:6.1f}x  "
+            f"({transacoes} transações)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Medição e resultados em JSON dos benchmarks, para comparar entre commits."""
+
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+import pandas as pd
+
+
+def measure(func, repeat=5):
+    """Executa func() repeat vezes; devolve (tempos em s, último resultado)"""
+    tempos = []
+    resultado = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resultado = func()
+        tempos.append(time.perf_counter() - start)
+    return tempos, resultado
+
+
+def summary(tempos, **extras):
+    """Mínimo, mediana e todas as medições de uma etapa, mais os campos extras"""
+    return {
+        "min_s": min(tempos),
+        "median_s": statistics.median(tempos),
+        "runs_s": tempos,
+        **extras,
+    }
+
+
+def throughput(tempos, **contagens):
+    """Resumo da etapa com cada contagem e sua taxa por segundo (pela mediana)"""
+    mediana = statistics.median(tempos)
+    taxas = {f"{nome}_por_s": total / mediana for nome, total in contagens.items()}
+    return summary(tempos, **contagens, **taxas)
+
+
+def _commit():
+    """Commit atual do repositório, ou None fora de um checkout do git"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(name, params, stages):
+    """Documento JSON de um benchmark: ambiente, parâmetros e etapas medidas"""
+    return {
+        "benchmark": name,
+        "commit": _commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "params": params,
+        "stages": stages,
+    }
+
+
+def write(documento, path=None):
+    """Grava o JSON em path e mostra a mediana de cada etapa; sem path, imprime o JSON"""
+    texto = json.dumps(documento, indent=2, ensure_ascii=False)
+    if not path:
+        print(texto)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(texto + "\n")
+    for nome, etapa in documento["stages"].items():
+        extras = "  ".join(
+            (
+                f"{chave}={valor:,.1f}"
+                if isinstance(valor, float)
+                else f"{chave}={valor:,}"
+            )
+            for chave, valor in etapa.items()
+            if chave not in ("min_s", "median_s", "runs_s")
+        )
+        print(f"{nome:<28} {etapa['median_s'] * 1000:10.1f} ms  {extras}")
+    print(f"resultados em {path}")
@@ -0,0 +1,82 @@
+"""Gera uma planilha no formato de data/data.xlsx com dados sintéticos.
+
+Uma aba "Resumo" (sem dígitos no nome, ignorada pelas páginas) e uma aba por
+mês ("01-2015", "02-2015", ...) com as colunas Rendimento, Valor, Pago,
+Finalidade e Categoria. O número de abas e de linhas por aba é configurável,
+para medir as páginas 1 e 2 com históricos maiores que o real.
+
+Uso: python -m benchmarks.synthetic_ledger /tmp/ledger.xlsx --sheets 120 --rows 500
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from finance import exportar
+
+FINALIDADES = [
+    "Fatura Itau",
+    "Fatura Nubank",
+    "Cartão XP",
+    "Aluguel",
+    "Luz",
+    "Água",
+    "Internet",
+    "Mercado",
+    "Escola",
+    None,
+]
+CATEGORIAS = ["Casa", "Cartão", "Lazer", "Saúde", "Educação", "Transporte"]
+
+
+def period_names(sheets, first_year=2015):
+    """Nomes das abas mensais, "MM-AAAA" em sequência a partir de janeiro"""
+    return [f"{k % 12 + 1:02d}-{first_year + k // 12}" for k in range(sheets)]
+
+
+def synthetic_sheet(rows, rng):
+    """Uma aba mensal: ~10% das linhas com Rendimento, ~90% com Valor"""
+    renda = rng.random(rows) < 0.1
+    return pd.DataFrame(
+        {
+            "Rendimento": np.where(renda, rng.integers(1000, 8000, rows), np.nan),
+            "Valor": np.where(~renda, rng.integers(1000, 200000, rows) / 100, np.nan),
+            "Pago": rng.choice(["Sim", "Não"], rows, p=[0.8, 0.2]),
+            "Finalidade": rng.choice(np.array(FINALIDADES, dtype=object), rows),
+            "Categoria": rng.choice(CATEGORIAS, rows),
+        }
+    )
+
+
+def synthetic_workbook(sheets=24, rows=50, seed=0):
+    """Abas da planilha ({nome: DataFrame}), na ordem em que são gravadas"""
+    rng = np.random.default_rng(seed)
+    abas = {"Resumo": pd.DataFrame({"Observação": ["Planilha sintética"]})}
+    for nome in period_names(sheets):
+        abas[nome] = synthetic_sheet(rows, rng)
+    return abas
+
+
+def write_workbook(path, sheets=24, rows=50, seed=0):
+    """Grava a planilha sintética em path (.xlsx) e devolve o número de bytes"""
+    conteudo = exportar.to_excel(synthetic_workbook(sheets, rows, seed))
+    with open(path, "wb") as f:
+        f.write(conteudo)
+    return len(conteudo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--sheets", type=int, default=24)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tamanho = write_workbook(args.path, args.sheets, args.rows, args.seed)
+    print(f"{args.path}: {args.sheets} abas x {args.rows} linhas, {tamanho:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
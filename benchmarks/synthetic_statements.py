@@ -0,0 +1,212 @@
+"""Gera faturas sintéticas (PDF no padrão Itaú e CSV no padrão XP) para os benchmarks.
+
+Os PDFs trazem, em texto, as linhas que finance/parsing.py reconhece:
+"Titular NOME" e "Cartão final NNNN" como cabeçalho, compras como
+"dd/mm ESTABELECIMENTO valor" e linhas de resumo que o parser descarta
+("Total da fatura ...", "Pagamento efetuado ..."). Uma fração dos PDFs pode
+sair sem cabeçalho, para forçar o caminho de extract_transactions_alternative.
+Os CSV têm as colunas Data;Estabelecimento;Portador;Valor;Parcela, com
+parcelas "n de m" e, nos arquivos da XP, linhas de "Pagamento de fatura".
+
+Os arquivos seguem o nome fatura_<mes>_<cartao>_<n>.<ext>, de onde
+faturas.fatura_info tira o mês e o cartão. O PDF é escrito à mão (uma fonte
+Type1 padrão e um comando de texto por linha), sem dependências.
+
+Uso: python -m benchmarks.synthetic_statements /tmp/faturas --pdfs 12 --csvs 12 --pages 4
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from finance import parsing
+
+ESTABELECIMENTOS = [
+    "APPLE.COM/BILL",
+    "UBER* TRIP",
+    "IFOOD *RESTAURANTE",
+    "POSTO SHELL",
+    "SUPERMERCADO BIG",
+    "FARMACIA SAO JOAO",
+    "NETFLIX.COM",
+    "AMAZON BR",
+    "PADARIA PAO QUENTE",
+    "MERCADOLIVRE*LOJA",
+]
+TITULARES = ["JORGE LEITE", "MARIA SILVA"]
+CARTOES_PDF = ["itau", "visa"]
+CARTOES_CSV = ["xp", "nubank"]
+RESUMOS = [
+    "Lançamentos no cartão",
+    "Total da fatura anterior {valor}",
+    "Pagamento efetuado em {data} -{valor}",
+    "Saldo financiado {valor}",
+    "Encargos de juros {valor}",
+]
+
+
+def _brl(centavos):
+    """Valor em centavos no formato da fatura ("1.234,56")"""
+    return f"{centavos // 100:,}".replace(",", ".") + f",{centavos % 100:02d}"
+
+
+def _data(rng):
+    """Data "dd/mm" de uma compra"""
+    return f"{rng.integers(1, 29):02d}/{rng.integers(1, 13):02d}"
+
+
+def statement_pages(rng, pages, lines_per_page, header=True):
+    """Linhas de texto de cada página de uma fatura PDF"""
+    paginas = []
+    for pagina in range(pages):
+        linhas = []
+        # O titular pode mudar de uma página para outra (cartões adicionais)
+        if header and (pagina == 0 or rng.random() < 0.3):
+            linhas.append(f"Titular {TITULARES[rng.integers(len(TITULARES))]}")
+            linhas.append(f"Cartão final {rng.integers(1000, 10000)}")
+        while len(linhas) < lines_per_page:
+            if rng.random() < 0.1:
+                resumo = RESUMOS[rng.integers(len(RESUMOS))]
+                linhas.append(
+                    resumo.format(
+                        valor=_brl(int(rng.integers(100, 500000))), data=_data(rng)
+                    )
+                )
+            else:
+                estab = ESTABELECIMENTOS[rng.integers(len(ESTABELECIMENTOS))]
+                valor = _brl(int(rng.integers(100, 900000)))
+                linhas.append(f"{_data(rng)} {estab} {valor}")
+        paginas.append(linhas)
+    return paginas
+
+
+def _escape(linha):
+    """Texto de uma linha como string literal do PDF (cp1252, para os acentos)"""
+    texto = linha.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"(" + texto.encode("cp1252") + b")"
+
+
+def write_pdf(path, pages):
+    """Grava um PDF mínimo com uma linha de texto por item de cada página"""
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>"
+        % (
+            b" ".join(b"%d 0 R" % (4 + 2 * k) for k in range(len(pages))),
+            len(pages),
+        ),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica"
+        b" /Encoding /WinAnsiEncoding >>",
+    ]
+    for k, linhas in enumerate(pages):
+        texto = b" ".join(_escape(linha) + b" Tj T*" for linha in linhas)
+        conteudo = b"BT /F1 9 Tf 12 TL 40 800 Td " + texto + b" ET"
+        objetos.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842]"
+            b" /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * k)
+        )
+        objetos.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(conteudo), conteudo)
+        )
+
+    saida = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+    xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for posicao in posicoes:
+        saida += b"%010d 00000 n \n" % posicao
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objetos) + 1,
+        xref,
+    )
+    with open(path, "wb") as f:
+        f.write(saida)
+    return len(saida)
+
+
+def statement_csv(rng, rows, xp=False):
+    """Texto de uma fatura CSV, separada por ponto e vírgula"""
+    linhas = ["Data;Estabelecimento;Portador;Valor;Parcela"]
+    for _ in range(rows):
+        estab = ESTABELECIMENTOS[rng.integers(len(ESTABELECIMENTOS))]
+        if xp and rng.random() < 0.05:
+            estab = "Pagamento de fatura"
+        total = int(rng.integers(2, 13))
+        parcela = (
+            f"{rng.integers(1, total + 1)} de {total}" if rng.random() < 0.3 else "-"
+        )
+        linhas.append(
+            f"{_data(rng)}/2024;{estab};{TITULARES[rng.integers(len(TITULARES))]};"
+            f"R$ {_brl(int(rng.integers(100, 900000)))};{parcela}"
+        )
+    return "\n".join(linhas) + "\n"
+
+
+def write_corpus(
+    directory,
+    pdfs=12,
+    csvs=12,
+    pages=4,
+    lines_per_page=40,
+    csv_rows=200,
+    fallback=0.0,
+    seed=0,
+):
+    """Grava as faturas sintéticas em directory; devolve os caminhos gravados.
+
+    fallback é a fração dos PDFs gravados sem as linhas de Titular/Cartão.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    caminhos = []
+    for k in range(pdfs):
+        mes = parsing.MESES[k % 12]
+        cartao = CARTOES_PDF[k % len(CARTOES_PDF)]
+        caminho = os.path.join(directory, f"fatura_{mes}_{cartao}_{k:03d}.pdf")
+        header = k >= round(pdfs * fallback)
+        write_pdf(caminho, statement_pages(rng, pages, lines_per_page, header))
+        caminhos.append(caminho)
+    for k in range(csvs):
+        mes = parsing.MESES[k % 12]
+        cartao = CARTOES_CSV[k % len(CARTOES_CSV)]
+        caminho = os.path.join(directory, f"fatura_{mes}_{cartao}_{k:03d}.csv")
+        # Gravado com BOM, como os CSV exportados pela XP
+        with open(caminho, "w", encoding="utf-8-sig", newline="") as f:
+            f.write(statement_csv(rng, csv_rows, xp=cartao == "xp"))
+        caminhos.append(caminho)
+    return caminhos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--pdfs", type=int, default=12)
+    parser.add_argument("--csvs", type=int, default=12)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--lines", type=int, default=40, help="linhas por página")
+    parser.add_argument("--rows", type=int, default=200, help="linhas por CSV")
+    parser.add_argument(
+        "--fallback", type=float, default=0.0, help="fração de PDFs sem cabeçalho"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    caminhos = write_corpus(
+        args.directory,
+        args.pdfs,
+        args.csvs,
+        args.pages,
+        args.lines,
+        args.rows,
+        args.fallback,
+        args.seed,
+    )
+    print(f"{len(caminhos)} faturas em {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Módulos compartilhados pelas páginas do app de finanças."""
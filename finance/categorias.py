@@ -0,0 +1,90 @@
+"""Categorização dos estabelecimentos das faturas por tabela de regras.
+
+As regras ficam em finance/categorias.json (ou em data/categorias.json, que
+tem prioridade e pode ser editado sem mexer no código): uma lista ordenada de
+categorias, cada uma com suas palavras-chave. Vale a primeira categoria da
+lista com alguma palavra contida no nome do estabelecimento, em minúsculas.
+
+As palavras de cada categoria viram uma única expressão regular, avaliada
+pelo pyarrow de uma vez sobre os estabelecimentos distintos (em minúsculas);
+o resultado volta para as linhas pelos códigos de um pd.Categorical.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from finance import storage
+
+REGRAS_PADRAO = os.path.join(os.path.dirname(__file__), "categorias.json")
+REGRAS_USUARIO = os.path.join("data", "categorias.json")
+
+
+def rules_path():
+    """Arquivo de regras em uso: o de data/ se existir, senão o padrão do pacote"""
+    if os.path.exists(REGRAS_USUARIO):
+        return REGRAS_USUARIO
+    return REGRAS_PADRAO
+
+
+def load_rules(path=None):
+    """Lê as regras e inclui uma versão (hash do arquivo) para usar como chave de cache"""
+    path = path or rules_path()
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    rules["version"] = storage.file_digest(path)
+    return rules
+
+
+def compile_rules(rules):
+    """Monta uma expressão (alternação das palavras) por categoria, na ordem de prioridade"""
+    padroes = []
+    for categoria in rules["categorias"]:
+        palavras = [p.lower() for p in categoria["palavras"] if p]
+        padroes.append("|".join(re.escape(p) for p in palavras) or None)
+    return padroes
+
+
+def _primeira_regra(textos, padroes):
+    """Índice da primeira regra que casa com cada texto, ou -1 se nenhuma casar"""
+    if not padroes:
+        return np.full(len(textos), -1, dtype=np.int64)
+    casou = np.zeros((len(padroes), len(textos)), dtype=bool)
+    for i, padrao in enumerate(padroes):
+        if padrao is not None:
+            casou[i] = pc.match_substring_regex(textos, padrao).to_numpy(
+                zero_copy_only=False
+            )
+    return np.where(casou.any(axis=0), casou.argmax(axis=0), -1)
+
+
+def categorize(estabelecimentos, rules):
+    """Classifica uma Series de estabelecimentos; retorna uma Series categórica"""
+    estabelecimentos = pd.Series(estabelecimentos)
+    nomes = [c["nome"] for c in rules["categorias"]]
+    padrao = rules.get("padrao", "Outros")
+    categorias = list(dict.fromkeys(nomes + [padrao]))
+
+    codes, uniques = pd.factorize(estabelecimentos, use_na_sentinel=False)
+    # Estabelecimentos vazios (NaN) ficam com a categoria padrão
+    textos = pa.array(
+        [u.lower() if isinstance(u, str) else "" for u in uniques], type=pa.string()
+    )
+    indices = _primeira_regra(textos, compile_rules(rules))
+
+    # Código da categoria de cada regra (nomes podem se repetir); o último item
+    # é o padrão, que o índice -1 dos estabelecimentos sem regra alcança
+    por_regra = np.array(
+        [categorias.index(n) for n in nomes] + [categorias.index(padrao)]
+    )
+    codigos = por_regra[indices][codes]
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, categories=categorias),
+        index=estabelecimentos.index,
+        name="Categoria",
+    )
@@ -0,0 +1,87 @@
+"""Cubo de agregação das transações do cartão para os gráficos das páginas.
+
+As transações são somadas uma vez por versão dos dados em células
+Mes_Fatura × Cartao × Portador × Categoria × Dia. Cada célula guarda as
+medidas de que os gráficos precisam (soma, contagens, parcelamento). O cubo
+fica ordenado por Dia, então o mesmo filtros.FilterIndex das transações
+filtra as células; cada gráfico é um groupby sobre as células filtradas, e
+não sobre as transações. No modo centavos as medidas em dinheiro são somadas
+como inteiros e só os resultados das consultas voltam para reais.
+"""
+
+import pandas as pd
+
+from finance import currency, filtros
+
+DIMENSOES = ["Mes_Fatura", "Cartao", "Portador", "Categoria", "Dia"]
+
+# Valor: soma; Transacoes: linhas; Qtd_Valor: linhas com Valor (base da média);
+# Parceladas: linhas parceladas; Valor_Parcelado/Valor_Total_Parcelado: somas
+# de Valor e Valor_Total só das parceladas
+MEDIDAS = [
+    "Valor",
+    "Transacoes",
+    "Qtd_Valor",
+    "Parceladas",
+    "Valor_Parcelado",
+    "Valor_Total_Parcelado",
+]
+MEDIDAS_MONETARIAS = ["Valor", "Valor_Parcelado", "Valor_Total_Parcelado"]
+
+
+def build_cube(df):
+    """Agrega as transações nas células do cubo, ordenadas por Dia"""
+    parcelado = df["É_Parcelado"].to_numpy(dtype=bool)
+    base = pd.DataFrame(
+        {
+            "Mes_Fatura": df["Mes_Fatura"],
+            "Cartao": df["Cartao"],
+            "Portador": df["Portador"],
+            "Categoria": df["Categoria"],
+            "Dia": df["Data"].dt.normalize(),
+            "Valor": df["Valor"],
+            "Transacoes": 1,
+            "Qtd_Valor": df["Valor"].notna(),
+            "Parceladas": parcelado,
+            "Valor_Parcelado": df["Valor"].where(parcelado),
+            "Valor_Total_Parcelado": df["Valor_Total"].where(parcelado),
+        }
+    )
+    # dropna=False mantém as linhas sem portador/cartão nos totais, como antes
+    cubo = (
+        base.groupby(DIMENSOES, dropna=False, observed=True, sort=False)[MEDIDAS]
+        .sum()
+        .reset_index()
+    )
+    return filtros.sort_by_date(cubo, "Dia")
+
+
+def totals(cubo):
+    """Soma de cada medida de um cubo (já filtrado), com os valores em reais"""
+    return {
+        medida: currency.to_reais(soma) if medida in MEDIDAS_MONETARIAS else soma
+        for medida, soma in cubo[MEDIDAS].sum().items()
+    }
+
+
+def by(cubo, dimensions, medida="Valor"):
+    """Soma de uma medida por uma ou mais dimensões (ou Series), como um groupby nas transações"""
+    soma = cubo.groupby(dimensions, observed=True)[medida].sum()
+    return currency.to_reais(soma) if medida in MEDIDAS_MONETARIAS else soma
+
+
+def summary_table(cubo, dimension):
+    """Total, nº de transações, média e parceladas por dimensão, maior total primeiro"""
+    grupos = cubo.groupby(dimension, observed=True)[
+        ["Valor", "Qtd_Valor", "Parceladas"]
+    ].sum()
+    grupos = currency.in_reais(grupos, ["Valor"])
+    resumo = pd.DataFrame(
+        {
+            "Total Gasto": grupos["Valor"],
+            "Nº Transações": grupos["Qtd_Valor"],
+            "Gasto Médio": grupos["Valor"] / grupos["Qtd_Valor"],
+            "Transações Parceladas": grupos["Parceladas"],
+        }
+    ).round(2)
+    return resumo.sort_values("Total Gasto", ascending=False)
@@ -0,0 +1,146 @@
+"""Conversão vetorizada de valores em reais (formato brasileiro) para números.
+
+Aplica às Series as mesmas regras de parsing.normaliza_valor ("1.374" é mil
+trezentos e setenta e quatro, "1.234,56", "-7,99", prefixo "R$"), mas com
+kernels do pyarrow.compute sobre um StringArray dos valores distintos da
+coluna (pd.factorize), em vez de uma chamada Python por linha.
+
+Com FINANCE_MONEY_CENTS=1 os valores em dinheiro da planilha e das faturas
+passam a ser centavos inteiros (Int64): somas e agregações ficam exatas e em
+aritmética inteira, e a divisão por 100 (to_reais/in_reais) só acontece nos
+totais já agregados e nos valores que vão para a tela ou para a exportação.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Valores em dinheiro como centavos inteiros (Int64) em vez de float64
+CENTS_MODE = os.environ.get("FINANCE_MONEY_CENTS", "0") == "1"
+
+# Colunas em dinheiro da planilha e das transações do cartão
+COLUNAS_MONETARIAS = ["Valor", "Rendimento", "Valor_Total", "Valor_Restante"]
+
+# Mesmas substituições de parsing.normaliza_valor: primeiro quebras de linha,
+# tabs e aspas tipográficas (o espaço fino vira espaço), depois a moeda
+_SUBSTITUICOES = [
+    ("\n", ""),
+    ("\r", ""),
+    ("\t", ""),
+    ("′", ""),
+    ("″", ""),
+    ("\u202f", " "),
+    ("R$", ""),
+    ("R", ""),
+    ("$", ""),
+]
+
+# Números que float() aceita depois da normalização
+_NUMERO = r"^-?(\d+(\.\d*)?|\.\d+)$"
+
+
+def _normaliza(textos):
+    """Normaliza um pyarrow.StringArray para o formato com ponto decimal"""
+    s = pc.utf8_trim_whitespace(textos)
+    for antes, depois in _SUBSTITUICOES:
+        s = pc.replace_substring(s, antes, depois)
+    s = pc.utf8_trim_whitespace(s)
+    tem_digito = pc.match_substring_regex(s, r"\d")
+
+    s = pc.replace_substring_regex(s, r"[^0-9.,-]+", "")
+    negativo = pc.starts_with(s, "-")
+    s = pc.if_else(negativo, pc.utf8_slice_codeunits(s, 1), s)
+
+    pontos = pc.count_substring(s, ".")
+    tem_virgula = pc.match_substring(s, ",")
+    sem_pontos = pc.replace_substring(s, ".", "")
+
+    # Um único ponto com três dígitos depois dele é separador de milhar
+    depois_do_ponto = pc.subtract(
+        pc.subtract(pc.utf8_length(s), pc.find_substring(s, ".")), 1
+    )
+    milhar = pc.and_(pc.equal(pontos, 1), pc.equal(depois_do_ponto, 3))
+    resultado = pc.if_else(milhar, sem_pontos, s)
+
+    # Vários pontos: só o último é decimal, então os anteriores saem um a um
+    varios = pc.greater(pontos, 1)
+    for _ in range((pc.max(pontos).as_py() or 1) - 1):
+        resultado = pc.if_else(
+            varios,
+            pc.replace_substring(resultado, ".", "", max_replacements=1),
+            resultado,
+        )
+        pontos = pc.subtract(pontos, pc.cast(varios, pa.int32()))
+        varios = pc.greater(pontos, 1)
+
+    # Com vírgula, ela é o separador decimal e os pontos são de milhar
+    resultado = pc.if_else(
+        tem_virgula, pc.replace_substring(sem_pontos, ",", "."), resultado
+    )
+
+    resultado = pc.if_else(
+        negativo, pc.binary_join_element_wise("-", resultado, ""), resultado
+    )
+    return pc.if_else(tem_digito, resultado, "0")
+
+
+def parse_brl(valores, cents=False):
+    """Converte uma Series de valores em reais para float64 (ou centavos em Int64).
+
+    Retorna (valores, suspeitos), onde suspeitos é uma máscara booleana com os
+    valores que não puderam ser convertidos (ficam NaN/<NA>) ou que viraram
+    menos de R$ 1 depois de reformatados, um sinal comum de erro de formato.
+    """
+    valores = pd.Series(valores)
+    codes, uniques = pd.factorize(valores.astype(str), use_na_sentinel=False)
+    originais = pa.array(uniques, type=pa.string())
+
+    normalizados = _normaliza(originais)
+    valido = pc.match_substring_regex(normalizados, _NUMERO)
+    numeros = pc.cast(pc.if_else(valido, normalizados, None), pa.float64())
+    numeros = numeros.to_numpy(zero_copy_only=False)
+
+    reformatado = pc.not_equal(originais, normalizados).to_numpy(zero_copy_only=False)
+    suspeitos = np.isnan(numeros) | ((numeros > 0) & (numeros < 1) & reformatado)
+
+    if cents:
+        convertidos = pd.array(np.round(numeros * 100), dtype="Int64")
+    else:
+        convertidos = numeros
+    resultado = pd.Series(convertidos[codes], index=valores.index, name=valores.name)
+    mascara = pd.Series(suspeitos[codes], index=valores.index, name=valores.name)
+    return resultado, mascara
+
+
+def to_cents(valores):
+    """Converte uma Series numérica (reais) ou de texto (formato brasileiro) para centavos Int64"""
+    valores = pd.Series(valores)
+    if valores.dtype == object:
+        return parse_brl(valores, cents=True)[0]
+    numeros = valores.to_numpy(dtype="float64", na_value=np.nan)
+    return pd.Series(
+        pd.array(np.round(numeros * 100), dtype="Int64"),
+        index=valores.index,
+        name=valores.name,
+    )
+
+
+def to_reais(valores):
+    """Centavos (escalar ou Series) para reais em float64; sem o modo centavos nada muda"""
+    if not CENTS_MODE:
+        return valores
+    if isinstance(valores, (pd.Series, pd.Index)):
+        return valores.astype("float64") / 100
+    return valores / 100
+
+
+def in_reais(df, columns=COLUNAS_MONETARIAS):
+    """Cópia do DataFrame com as colunas em dinheiro em reais, para exibir ou exportar"""
+    if not CENTS_MODE:
+        return df
+    return df.assign(
+        **{column: to_reais(df[column]) for column in columns if column in df}
+    )
@@ -0,0 +1,249 @@
+"""Carregadores com cache do Streamlit compartilhados entre as páginas."""
+
+import pandas as pd
+import streamlit as st
+
+from finance import (
+    categorias,
+    cubo,
+    currency,
+    esquema,
+    exportar,
+    faturas,
+    figuras,
+    filtros,
+    formatos,
+    ledger,
+    parcelas,
+    perfil,
+    watcher,
+)
+
+
+@st.cache_resource
+def background_watcher():
+    """Watcher de ingestão em segundo plano, um por processo (com FINANCE_WATCH=1)"""
+    return watcher.Watcher().start()
+
+
+@st.cache_resource
+def figure_cache():
+    """Cache das figuras Plotly, um por processo (compartilhado entre sessões)"""
+    return figuras.FigureCache()
+
+
+def figure(chart_id, key, build):
+    """Figura do cache para (chart_id, key) ou montada agora por build().
+
+    key deve trazer a versão dos dados e os valores de filtro que afetam o
+    gráfico, e nada além disso.
+    """
+    with perfil.stage(f"figura {chart_id}"):
+        return figure_cache().get(chart_id, key, build)
+
+
+@perfil.timed
+def ledger_snapshot():
+    """Sincroniza o snapshot da planilha; só lê o manifesto quando nada mudou"""
+    with st.spinner("Carregando dados..."):
+        if watcher.WATCH_ENABLED:
+            return background_watcher().snapshot("ledger")
+        return ledger.sync_snapshot()
+
+
+@perfil.timed
+@st.cache_data(show_spinner="Carregando dados...", max_entries=2)
+def load_ledger_frame(version, _manifest):
+    """Lê todas as abas mensais uma única vez por versão dos dados"""
+    return ledger.build_ledger_frame(_manifest)
+
+
+@perfil.timed
+@st.cache_data(show_spinner="Calculando indicadores...", max_entries=2)
+def load_kpi_table(version, _manifest):
+    """Tabela de indicadores mensais, calculada uma vez por versão dos dados"""
+    return ledger.build_kpi_table(load_ledger_frame(version, _manifest))
+
+
+@perfil.timed
+@st.cache_data(max_entries=2)
+def load_kpi_display(version, _manifest):
+    """Tabela de indicadores com valores e percentuais já formatados, uma vez por versão"""
+    kpis = load_kpi_table(version, _manifest)
+    formatadas = {
+        column: formatos.brl(kpis[column]) for column in ledger.COLUNAS_KPI_MONETARIAS
+    }
+    formatadas.update(
+        {
+            column: formatos.percent(kpis[column])
+            for column in kpis.columns
+            if column.endswith("(%)")
+        }
+    )
+    return kpis.assign(**formatadas)
+
+
+@perfil.timed
+def faturas_snapshot():
+    """Sincroniza as faturas; só os arquivos novos ou alterados são processados"""
+    with st.spinner("Processando faturas..."):
+        if watcher.WATCH_ENABLED:
+            return background_watcher().snapshot("faturas")
+        return faturas.sync_faturas()
+
+
+@perfil.timed
+@st.cache_resource(show_spinner="Carregando faturas...", max_entries=2)
+def load_transactions(version, _manifest, rules_version, _rules):
+    """Transações de todas as faturas, montadas uma vez por versão dos dados e das regras.
+
+    As transações de cada arquivo já foram extraídas por faturas.sync_faturas();
+    aqui só se juntam as peças gravadas, se calculam as colunas derivadas, se
+    compactam os tipos das colunas e se ordenam as linhas por data.
+    Com st.cache_resource todas as páginas recebem o mesmo DataFrame, sem
+    cópia, então elas não devem alterá-lo no lugar (filtrar ou usar .copy()).
+    """
+    try:
+        if not _manifest["order"]:
+            st.error("Nenhum arquivo de fatura encontrado em data/faturas/")
+            return None
+        for filename in _manifest["order"]:
+            for message in _manifest["files"][filename]["messages"]:
+                st.warning(message)
+        all_dataframes = faturas.load_pieces(_manifest)
+        if not all_dataframes:
+            st.error("Nenhum arquivo foi carregado com sucesso")
+            return None
+        df = pd.concat(all_dataframes, ignore_index=True)
+
+        # Converter a coluna Data para datetime
+        df["Data"] = pd.to_datetime(df["Data"], format="%d/%m/%Y", errors="coerce")
+
+        # Limpar e converter a coluna Valor (se vier como string); no modo
+        # centavos (FINANCE_MONEY_CENTS=1) ela fica em centavos Int64
+        if df["Valor"].dtype == object:
+            valores, suspeitos = currency.parse_brl(
+                df["Valor"], cents=currency.CENTS_MODE
+            )
+            if suspeitos.any():
+                exemplos = ", ".join(
+                    df.loc[suspeitos, "Valor"].astype(str).unique()[:5]
+                )
+                st.warning(
+                    f"{int(suspeitos.sum())} valores suspeitos na coluna Valor "
+                    f"(ex.: {exemplos})"
+                )
+            df["Valor"] = valores
+        elif currency.CENTS_MODE:
+            df["Valor"] = currency.to_cents(df["Valor"])
+
+        # Extrair informações de parcelamento e o valor total das compras parceladas
+        df = parcelas.add_columns(df)
+        # Categorizar estabelecimentos (regras em finance/categorias.json ou data/categorias.json)
+        df["Categoria"] = categorias.categorize(df["Estabelecimento"], _rules)
+        # Categóricas, string do Arrow e inteiros pequenos no lugar de object
+        df = esquema.compact(df)
+        # Ordenadas por data, para os filtros de período virarem fatias
+        return filtros.sort_by_date(df)
+    except Exception as e:
+        st.error(f"Erro ao carregar os dados: {e}")
+        return None
+
+
+@perfil.timed
+@st.cache_resource(max_entries=2)
+def load_filter_index(version, rules_version, _df):
+    """Índice dos filtros da barra lateral, montado uma vez por versão das transações"""
+    return filtros.FilterIndex(_df, version=(version, rules_version))
+
+
+@perfil.timed
+@st.cache_resource(max_entries=2)
+def load_cube(version, rules_version, _df):
+    """Cubo de agregação (com seu índice de filtros), montado uma vez por versão"""
+    return filtros.FilterIndex(
+        cubo.build_cube(_df), date_column="Dia", version=(version, rules_version)
+    )
+
+
+def credit_card_data():
+    """Sincroniza faturas e regras e devolve (transações, índice de filtros, cubo).
+
+    Tudo é compartilhado entre as páginas; (None, None, None) se não houver
+    faturas carregadas. O cubo vem dentro de um FilterIndex, para ser
+    filtrado pelos mesmos critérios das transações.
+    """
+    manifest = faturas_snapshot()
+    rules = categorias.load_rules()
+    df = load_transactions(manifest["version"], manifest, rules["version"], rules)
+    if df is None:
+        return None, None, None
+    return (
+        df,
+        load_filter_index(manifest["version"], rules["version"], df),
+        load_cube(manifest["version"], rules["version"], df),
+    )
+
+
+@perfil.timed
+@st.cache_resource(max_entries=2)
+def load_display_columns(version, _df):
+    """Data e Valor das transações já formatados para a tabela, uma vez por versão"""
+    return pd.DataFrame(
+        {
+            "Data": formatos.dates(_df["Data"]),
+            "Valor": formatos.brl(currency.to_reais(_df["Valor"])),
+        },
+        index=_df.index,
+    )
+
+
+@perfil.timed
+@st.cache_data(show_spinner="Gerando arquivos...", max_entries=4)
+def export_files(key, _df, _resumo):
+    """CSV e Excel da tabela filtrada, gerados só quando pedidos.
+
+    key identifica a versão dos dados e o estado dos filtros que produziram
+    _df e _resumo; enquanto ela não muda, os arquivos vêm do cache.
+    """
+    df = currency.in_reais(_df)
+    return exportar.to_csv(df), exportar.to_excel({"Dados": df, "Resumo": _resumo})
+
+
+def show_memory_report(frames):
+    """Memória de cada DataFrame ({nome: df}) na barra lateral, com FINANCE_MEMORY_REPORT=1"""
+    if not esquema.MEMORY_REPORT:
+        return
+    with st.sidebar.expander("🧠 Uso de memória"):
+        for nome, frame in frames.items():
+            relatorio = esquema.memory_report(frame)
+            st.caption(
+                f"{nome}: {len(frame):,} linhas, {relatorio.loc['Total', 'MB']:.2f} MB"
+            )
+            st.dataframe(relatorio, use_container_width=True)
+
+
+def show_timings(rerun):
+    """Tempo de cada etapa da execução na barra lateral, com FINANCE_TIMINGS=1"""
+    if not perfil.TIMINGS or rerun is None:
+        return
+    with st.sidebar.expander("⏱️ Tempo da execução"):
+        st.caption(f"Total: {rerun.total * 1000:,.1f} ms")
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Etapa": [
+                        "\u2003" * etapa["depth"] + etapa["name"]
+                        for etapa in rerun.stages
+                    ],
+                    "ms": [etapa["seconds"] * 1000 for etapa in rerun.stages],
+                    "%": [
+                        etapa["seconds"] / rerun.total * 100 for etapa in rerun.stages
+                    ],
+                }
+            ).round(1),
+            hide_index=True,
+            use_container_width=True,
+        )
+        if rerun.profile:
+            st.caption(f"Perfil gravado em {rerun.profile}")
@@ -0,0 +1,56 @@
+"""Esquema compacto do DataFrame de transações do cartão.
+
+As colunas de texto com poucos valores distintos viram categóricas (um código
+inteiro por linha em vez de um objeto str), o Estabelecimento vira string do
+Arrow e as parcelas ficam em inteiros anuláveis pequenos. O DataFrame
+compartilhado e cada cópia filtrada pelas sessões ocupam uma fração da
+memória das colunas object.
+
+Com FINANCE_MEMORY_REPORT=1 as páginas de cartão mostram, na barra lateral, o
+memory_usage(deep=True) de cada coluna.
+"""
+
+import os
+
+import pandas as pd
+
+# Mostra o relatório de memória na barra lateral das páginas de cartão
+MEMORY_REPORT = os.environ.get("FINANCE_MEMORY_REPORT", "0") == "1"
+
+COLUNAS_CATEGORICAS = [
+    "Portador",
+    "Cartao",
+    "Mes_Fatura",
+    "Arquivo_Fonte",
+    "Parcela",
+    "Categoria",
+]
+COLUNAS_TEXTO = ["Estabelecimento"]
+COLUNAS_PARCELA = ["Parcela_Atual", "Total_Parcelas"]
+
+
+def compact(df):
+    """Converte as colunas das transações para os tipos compactos (no lugar)"""
+    for column in COLUNAS_CATEGORICAS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    for column in COLUNAS_TEXTO:
+        if column in df:
+            df[column] = df[column].astype("string[pyarrow]")
+    for column in COLUNAS_PARCELA:
+        if column in df:
+            df[column] = df[column].astype("Int16")
+    return df
+
+
+def memory_report(df):
+    """Tipo e memória (MB, com o conteúdo dos objetos) de cada coluna, e o total"""
+    uso = df.memory_usage(deep=True)
+    relatorio = pd.DataFrame(
+        {
+            "Tipo": df.dtypes.astype(str).reindex(uso.index, fill_value="índice"),
+            "MB": uso / 2**20,
+        }
+    )
+    relatorio.loc["Total"] = ["", relatorio["MB"].sum()]
+    return relatorio.round({"MB": 3})
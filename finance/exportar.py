@@ -0,0 +1,44 @@
+"""Arquivos de exportação (CSV e Excel) das transações, gerados em memória.
+
+Nada é gravado no diretório de trabalho: o Excel é montado num BytesIO, então
+sessões simultâneas não disputam um mesmo arquivo temporário. Tabelas grandes
+vão pelo modo write-only do openpyxl, que grava as linhas em sequência sem
+manter as células de toda a planilha em memória.
+"""
+
+import io
+
+import pandas as pd
+from openpyxl import Workbook
+
+# A partir deste número de linhas o Excel é gravado no modo write-only
+WRITE_ONLY_ROWS = 20_000
+
+
+def to_csv(df):
+    """CSV separado por ponto e vírgula, como texto"""
+    return df.to_csv(index=False, sep=";")
+
+
+def _rows(df):
+    """Linhas do DataFrame como tuplas de valores Python, com None nos faltantes"""
+    valores = df.astype(object)
+    return valores.where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def to_excel(sheets):
+    """Planilha .xlsx (bytes) com uma aba por DataFrame de sheets ({nome: df})"""
+    buffer = io.BytesIO()
+    if max(len(df) for df in sheets.values()) < WRITE_ONLY_ROWS:
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            for nome, df in sheets.items():
+                df.to_excel(writer, index=False, sheet_name=nome)
+    else:
+        workbook = Workbook(write_only=True)
+        for nome, df in sheets.items():
+            sheet = workbook.create_sheet(nome)
+            sheet.append([str(column) for column in df.columns])
+            for row in _rows(df):
+                sheet.append(row)
+        workbook.save(buffer)
+    return buffer.getvalue()
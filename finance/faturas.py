@@ -0,0 +1,408 @@
+"""Ingestão incremental das faturas de cartão em data/faturas/.
+
+Cada fatura (CSV ou PDF) é processada uma única vez: as transações extraídas
+ficam gravadas em data/.cache/faturas/ e o manifesto registra, por arquivo, o
+hash, o tamanho, o mtime e a versão do parser usada (e, nos CSV, o encoding e
+o separador detectados). Em uma nova carga só os arquivos novos ou alterados
+passam de novo pelo pandas/pdfplumber; os demais são lidos das peças já
+gravadas. As métricas de cada arquivo processado (finance/metricas.py) também
+ficam no manifesto e vão para o log de ingestão.
+"""
+
+import codecs
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from finance import metricas, parsing, pdf_pages, storage
+
+FATURAS_DIR = os.path.join("data", "faturas")
+CACHE_DIR = os.path.join("data", ".cache", "faturas")
+MANIFEST_NAME = "manifest.json"
+
+# Incrementar sempre que a extração mudar, para reprocessar as faturas já ingeridas
+PARSER_VERSION = 2
+
+# Bytes lidos do começo de um CSV para detectar encoding e separador
+SNIFF_BYTES = 4096
+SEPARADORES = [";", ",", "\t", "|"]
+_BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Colunas das faturas CSV usadas pelas páginas (as de descrição servem ao filtro da XP)
+COLUNAS_DESCRICAO = [
+    "Descrição",
+    "Estabelecimento",
+    "Descricao",
+    "Local",
+    "Local da Compra",
+]
+COLUNAS_CSV = {"Data", "Portador", "Valor", "Parcela", *COLUNAS_DESCRICAO}
+
+
+def fatura_files(faturas_dir=FATURAS_DIR):
+    """Lista as faturas em ordem fixa: primeiro os CSV, depois os PDF"""
+    return sorted(glob.glob(os.path.join(faturas_dir, "fatura_*.csv"))) + sorted(
+        glob.glob(os.path.join(faturas_dir, "fatura_*.pdf"))
+    )
+
+
+def fatura_info(filename):
+    """Extrai mês e cartão do nome do arquivo (fatura_[mes]_[cartao].ext)"""
+    parts = filename.replace(".csv", "").replace(".pdf", "").split("_")
+    if len(parts) >= 3:
+        return parts[1], parts[2]
+    return "Desconhecido", "Desconhecido"
+
+
+def sniff_csv(file_path, sample_size=SNIFF_BYTES):
+    """Detecta encoding e separador de uma fatura CSV lendo só o começo do arquivo.
+
+    BOM indica o encoding; sem BOM, vale utf-8 se a amostra decodificar, senão
+    cp1252 (exportações do Excel no Windows) e, em último caso, latin1. O
+    separador é o candidato que mais aparece no cabeçalho, com ";" no empate.
+    """
+    with open(file_path, "rb") as f:
+        amostra = f.read(sample_size)
+
+    encoding = None
+    for bom, nome in _BOMS:
+        if amostra.startswith(bom):
+            encoding = nome
+            break
+    if encoding is None:
+        for nome in ("utf-8", "cp1252"):
+            try:
+                # final=False tolera um caractere multibyte cortado no fim da amostra
+                codecs.getincrementaldecoder(nome)().decode(amostra, final=False)
+            except UnicodeDecodeError:
+                continue
+            encoding = nome
+            break
+        else:
+            encoding = "latin1"
+
+    texto = codecs.getincrementaldecoder(encoding)(errors="replace").decode(amostra)
+    cabecalho = next((linha for linha in texto.splitlines() if linha.strip()), "")
+    sep = max(SEPARADORES, key=lambda c: (cabecalho.count(c), c == ";"))
+    return {"encoding": encoding, "sep": sep}
+
+
+def parse_csv(file_path, dialect=None, metrics=None):
+    """Lê uma fatura CSV; retorna (DataFrame ou None, mensagens)
+
+    dialect ({"encoding", "sep"}) vem do manifesto quando o arquivo já foi
+    examinado; sem ele, sniff_csv() é chamado aqui. metrics (um
+    metricas.FileMetrics) recebe as linhas lidas e as descartadas.
+    """
+    filename = os.path.basename(file_path)
+    mes, cartao = fatura_info(filename)
+    dialect = dialect or sniff_csv(file_path)
+
+    # Uma única leitura, tudo como texto: Data e Valor são convertidos depois
+    opcoes = dict(sep=dialect["sep"], dtype=str, usecols=lambda col: col in COLUNAS_CSV)
+    try:
+        df = pd.read_csv(file_path, encoding=dialect["encoding"], **opcoes)
+    except UnicodeDecodeError:
+        # Byte inválido depois da amostra: latin1 aceita qualquer byte
+        df = pd.read_csv(file_path, encoding="latin1", **opcoes)
+    if metrics is not None:
+        metrics.lines = len(df)
+
+    # Limpar a coluna Valor se existir
+    if "Valor" in df.columns:
+        df["Valor"] = df["Valor"].astype(str).str.strip()
+        # Remover caracteres especiais e quebras de linha
+        df["Valor"] = (
+            df["Valor"].str.replace("\n", "").str.replace("\r", "").replace("\t", "")
+        )
+        df["Valor"] = (
+            df["Valor"].str.replace("′", "").replace("″", "").replace("\u202f", " ")
+        )
+        # Remover espaços extras
+        df["Valor"] = df["Valor"].str.strip()
+
+    # Para arquivos XP, ignorar linhas com "Pagamento de fatura"
+    if "xp" in filename.lower():
+        # Verificar se existe uma coluna de descrição ou estabelecimento
+        for col in COLUNAS_DESCRICAO:
+            if col in df.columns:
+                lidas = len(df)
+                df = df[
+                    ~df[col]
+                    .astype(str)
+                    .str.contains("Pagamento de fatura", case=False, na=False)
+                ]
+                if metrics is not None:
+                    metrics.reject("pagamento_de_fatura", lidas - len(df))
+                break
+
+    df["Arquivo_Fonte"] = filename
+    df["Mes_Fatura"] = mes
+    df["Cartao"] = cartao
+    if metrics is not None:
+        metrics.transactions = len(df)
+    return df, []
+
+
+def parse_pdf(file_path, page_texts=None, metrics=None):
+    """Extrai as transações de uma fatura PDF (padrão Itaú); retorna (DataFrame ou None, mensagens)
+
+    page_texts permite passar o texto das páginas já extraído (por exemplo,
+    pela ingestão paralela); sem ele o PDF é lido aqui mesmo. metrics (um
+    metricas.FileMetrics) recebe as páginas e as contagens do parser.
+    """
+    filename = os.path.basename(file_path)
+    mes, _ = fatura_info(filename)
+    messages = []
+
+    if page_texts is None:
+        page_texts = pdf_pages.extract_pages(file_path)
+
+    rows, usou_alternativa = parsing.parse_statement_pages(
+        page_texts, filename, mes, datetime.now().year, metrics
+    )
+    if metrics is not None:
+        metrics.pages = len(page_texts)
+        metrics.transactions = len(rows)
+        metrics.fallback = usou_alternativa
+    if usou_alternativa:
+        messages.append(f"Nenhuma transação encontrada em {file_path}")
+
+    if rows:
+        df = pd.DataFrame(rows)
+        df["Valor"] = df["Valor"].astype(float)
+        return df, messages
+
+    return None, messages
+
+
+def parse_fatura(file_path, page_texts=None, dialect=None, metrics=None):
+    """Processa uma fatura (CSV ou PDF) e retorna (DataFrame ou None, mensagens)"""
+    if file_path.endswith(".csv"):
+        try:
+            return parse_csv(file_path, dialect, metrics)
+        except Exception as e:
+            if metrics is not None:
+                metrics.error = str(e)
+            return None, [f"Erro ao carregar {file_path}: {e}"]
+    try:
+        if isinstance(page_texts, Exception):
+            raise page_texts
+        return parse_pdf(file_path, page_texts, metrics)
+    except Exception as e:
+        if metrics is not None:
+            metrics.error = str(e)
+        return None, [f"Erro ao processar PDF {file_path}: {e}"]
+
+
+def parse_faturas(
+    file_paths, workers=pdf_pages.INGEST_WORKERS, dialects=None, metrics=None
+):
+    """Processa várias faturas; com workers > 1 o texto dos PDFs é extraído em paralelo.
+
+    dialects (caminho -> {"encoding", "sep"}) evita detectar de novo o formato
+    dos CSV. Retorna um dicionário caminho -> (DataFrame ou None, mensagens),
+    na ordem de file_paths, com o mesmo resultado do processamento sequencial.
+    Se metrics for um dicionário, recebe caminho -> metricas.FileMetrics; com
+    workers > 1 o tempo e a memória de cada PDF não incluem a extração do
+    texto, feita antes e em outros processos.
+    """
+    metrics = {} if metrics is None else metrics
+    dialects = dialects or {}
+    pdf_paths = [p for p in file_paths if p.endswith(".pdf")]
+    if workers > 1 and pdf_paths:
+        texts = pdf_pages.extract_texts(pdf_paths, workers=workers)
+    else:
+        texts = {}
+    parsed = {}
+    for p in file_paths:
+        metrics[p] = metricas.FileMetrics(
+            os.path.basename(p), os.path.splitext(p)[1].lstrip("."), os.path.getsize(p)
+        )
+        with metricas.measure(metrics[p]):
+            parsed[p] = parse_fatura(p, texts.get(p), dialects.get(p), metrics[p])
+    return parsed
+
+
+# Serializa sync_faturas entre as threads das sessões e a do watcher
+_sync_lock = threading.Lock()
+
+
+def _is_current(entry, stat):
+    """Verifica pelo mtime/tamanho se a entrada do manifesto ainda vale para o arquivo"""
+    return (
+        not entry.get("error")
+        and entry.get("parser_version") == PARSER_VERSION
+        and entry.get("size") == stat.st_size
+        and entry.get("mtime") == stat.st_mtime
+    )
+
+
+def sync_faturas(
+    faturas_dir=FATURAS_DIR,
+    cache_dir=CACHE_DIR,
+    workers=pdf_pages.INGEST_WORKERS,
+    remove_stale=True,
+    metrics_dir=metricas.METRICS_DIR,
+):
+    """Atualiza o manifesto de faturas, processando só arquivos novos ou alterados.
+
+    Um arquivo cujo mtime/tamanho mudou mas cujo hash continua igual (por
+    exemplo, copiado de novo para a pasta) reaproveita a peça já gravada.
+    Arquivos que deram erro na leitura ficam marcados com "error" e são
+    processados de novo a cada sincronização.
+    Com workers > 1 os PDFs pendentes são lidos em paralelo. Com
+    remove_stale=False as peças da versão anterior ficam no disco até
+    prune_pieces(). As métricas dos arquivos processados vão para o log de
+    ingestão em metrics_dir, e faturas.prom é regravado com as de todos.
+
+    Uma sincronização por vez no processo: sessões que abrem ao mesmo tempo
+    esperam a primeira e encontram as faturas já processadas.
+    """
+    with _sync_lock:
+        return _sync_faturas(faturas_dir, cache_dir, workers, remove_stale, metrics_dir)
+
+
+def _sync_faturas(faturas_dir, cache_dir, workers, remove_stale, metrics_dir):
+    """Corpo de sync_faturas(), chamado com _sync_lock adquirido"""
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    manifest = storage.load_manifest(manifest_path)
+    previous = manifest.get("files", {})
+
+    files = {}
+    order = []
+    pending = []
+    dialects = {}
+    changed = False
+    for file_path in fatura_files(faturas_dir):
+        filename = os.path.basename(file_path)
+        stat = os.stat(file_path)
+        entry = previous.get(filename, {})
+        order.append(filename)
+
+        if _is_current(entry, stat) and _piece_exists(entry, cache_dir):
+            files[filename] = entry
+            continue
+
+        sha256 = storage.file_digest(file_path)
+        changed = True
+        if (
+            entry.get("sha256") == sha256
+            and not entry.get("error")
+            and entry.get("parser_version") == PARSER_VERSION
+            and _piece_exists(entry, cache_dir)
+        ):
+            files[filename] = dict(entry, size=stat.st_size, mtime=stat.st_mtime)
+            continue
+
+        pending.append((file_path, sha256, stat))
+        if file_path.endswith(".csv"):
+            # O formato detectado vale enquanto o conteúdo for o mesmo
+            if entry.get("sha256") == sha256 and "csv" in entry:
+                dialects[file_path] = entry["csv"]
+            else:
+                dialects[file_path] = sniff_csv(file_path)
+
+    metrics = {}
+    parsed = parse_faturas(
+        [file_path for file_path, _, _ in pending], workers, dialects, metrics
+    )
+    for file_path, sha256, stat in pending:
+        filename = os.path.basename(file_path)
+        df, messages = parsed[file_path]
+        piece = None
+        if df is not None:
+            stem = os.path.splitext(filename)[0]
+            piece = f"{stem}-{sha256[:16]}-v{PARSER_VERSION}.pkl"
+            _write_piece(df, os.path.join(cache_dir, piece))
+        files[filename] = {
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "parser_version": PARSER_VERSION,
+            "piece": piece,
+            "messages": messages,
+            "metrics": metrics[file_path].record(),
+        }
+        # Arquivo que não pôde ser lido: processado de novo na próxima sincronização
+        if metrics[file_path].error is not None:
+            files[filename]["error"] = True
+        if file_path in dialects:
+            files[filename]["csv"] = dialects[file_path]
+
+    if not changed and set(files) == set(previous) and "version" in manifest:
+        return manifest
+
+    version = hashlib.sha256()
+    for filename in order:
+        version.update(f"{filename}\x00{files[filename]['sha256']}\x00".encode("utf-8"))
+    version.update(f"v{PARSER_VERSION}".encode("utf-8"))
+    manifest = {"files": files, "order": order, "version": version.hexdigest()}
+    storage.save_manifest(manifest_path, manifest)
+    metricas.write(
+        "faturas",
+        [files[os.path.basename(file_path)]["metrics"] for file_path, _, _ in pending],
+        [
+            files[filename]["metrics"]
+            for filename in order
+            if "metrics" in files[filename]
+        ],
+        metrics_dir,
+    )
+    if remove_stale:
+        prune_pieces(manifest, cache_dir)
+    return manifest
+
+
+def _piece_exists(entry, cache_dir):
+    """Arquivos sem transações não têm peça; os demais precisam dela no disco"""
+    if "piece" not in entry:
+        return False
+    return entry["piece"] is None or os.path.exists(
+        os.path.join(cache_dir, entry["piece"])
+    )
+
+
+def _write_piece(df, path):
+    """Grava as transações de um arquivo de forma atômica"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Nome temporário único: as sessões do Streamlit são threads do mesmo processo
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    os.close(fd)
+    try:
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def prune_pieces(manifest, cache_dir=CACHE_DIR):
+    """Remove peças de arquivos que saíram da pasta ou foram reprocessados"""
+    keep = {entry["piece"] for entry in manifest.get("files", {}).values()}
+    for file_name in os.listdir(cache_dir):
+        if file_name.endswith(".pkl") and file_name not in keep:
+            try:
+                os.remove(os.path.join(cache_dir, file_name))
+            except FileNotFoundError:
+                pass
+
+
+def load_pieces(manifest, cache_dir=CACHE_DIR):
+    """Lê as transações gravadas de cada fatura, na ordem do manifesto"""
+    frames = []
+    for filename in manifest.get("order", []):
+        piece = manifest["files"][filename]["piece"]
+        if piece is not None:
+            frames.append(pd.read_pickle(os.path.join(cache_dir, piece)))
+    return frames
@@ -0,0 +1,49 @@
+"""Cache LRU das figuras Plotly das páginas.
+
+Cada gráfico é identificado por um id e por uma chave com a versão dos dados
+e só os valores de filtro que o afetam. Enquanto a chave não muda, a página
+recebe a figura já montada (o st.plotly_chart só a serializa), então mexer
+num widget que não altera um gráfico não refaz o px/go.Figure dele. As
+figuras são compartilhadas entre sessões e não devem ser alteradas depois de
+montadas.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+# Máximo de figuras mantidas em memória (todas as páginas e sessões)
+MAX_FIGURES = int(os.environ.get("FINANCE_FIGURE_CACHE", "256"))
+
+
+class FigureCache:
+    """Figuras montadas, da menos para a mais recentemente usada"""
+
+    def __init__(self, max_entries=MAX_FIGURES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chart_id, key, build):
+        """Figura do gráfico chart_id para a chave; build() a monta quando não está no cache"""
+        chave = (chart_id, key)
+        with self._lock:
+            figura = self._figures.get(chave)
+            if figura is not None:
+                self._figures.move_to_end(chave)
+                self.hits += 1
+                return figura
+
+        figura = build()
+        with self._lock:
+            self.misses += 1
+            self._figures[chave] = figura
+            self._figures.move_to_end(chave)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figura
+
+    def __len__(self):
+        return len(self._figures)
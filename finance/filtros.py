@@ -0,0 +1,118 @@
+"""Índice para os filtros da barra lateral das páginas de cartão.
+
+As transações chegam ordenadas por Data (NaT no fim), então um período vira
+uma fatia achada com searchsorted. Para Portador, Cartao e Mes_Fatura, cada
+valor guarda as posições (crescentes) das suas linhas; um filtro é só
+recortar essas posições ao período e cruzar com os demais. O custo de
+filtrar cresce com o tamanho do resultado, não com o histórico.
+
+Para a tabela de detalhamento, a ordem de cada coluna sobre todas as linhas é
+calculada uma única vez (na primeira vez em que é pedida); ordenar um
+resultado filtrado é só ordenar as suas posições por essa ordem.
+"""
+
+from datetime import timedelta
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_FILTRO = ("Portador", "Cartao", "Mes_Fatura")
+
+
+def sort_by_date(df, date_column="Data"):
+    """Ordena as transações por data (ordenação estável, NaT no fim)"""
+    return df.sort_values(date_column, kind="stable", na_position="last").reset_index(
+        drop=True
+    )
+
+
+class FilterIndex:
+    """Posições pré-calculadas de um DataFrame ordenado por data.
+
+    options[coluna] traz os valores distintos na ordem em que aparecem, para
+    as caixas de seleção; select() devolve uma cópia só das linhas filtradas.
+    version identifica os dados indexados, para compor chaves de cache.
+    """
+
+    def __init__(self, df, columns=COLUNAS_FILTRO, date_column="Data", version=None):
+        if not df[date_column].is_monotonic_increasing:
+            df = sort_by_date(df, date_column)
+        self.df = df
+        self.version = version
+        self._ranks = {}
+
+        datas = df[date_column].to_numpy(dtype="datetime64[ns]")
+        self._datas = datas[~np.isnat(datas)]
+        self.min_date = pd.Timestamp(self._datas[0]) if len(self._datas) else None
+        self.max_date = pd.Timestamp(self._datas[-1]) if len(self._datas) else None
+
+        self.options = {}
+        self._positions = {}
+        for column in columns:
+            codes, uniques = pd.factorize(df[column])
+            # Posições de cada valor, em ordem crescente (argsort estável)
+            ordem = np.argsort(codes, kind="stable")
+            limites = np.searchsorted(codes[ordem], np.arange(len(uniques) + 1))
+            self.options[column] = list(uniques)
+            self._positions[column] = {
+                valor: ordem[limites[i] : limites[i + 1]]
+                for i, valor in enumerate(uniques)
+            }
+
+    def date_slice(self, start=None, end=None):
+        """Intervalo [início, fim) de linhas com Data entre start e end (datas, inclusivas)"""
+        if start is None or end is None:
+            return 0, len(self.df)
+        inicio = np.datetime64(pd.Timestamp(start), "ns")
+        fim = np.datetime64(pd.Timestamp(end + timedelta(days=1)), "ns")
+        return (
+            int(np.searchsorted(self._datas, inicio, side="left")),
+            int(np.searchsorted(self._datas, fim, side="left")),
+        )
+
+    def positions(self, start=None, end=None, **values):
+        """Posições das linhas que passam em todos os filtros, ou um slice se só houver período"""
+        lo, hi = self.date_slice(start, end)
+        if not values:
+            return slice(lo, hi)
+
+        selecionadas = []
+        for column, value in values.items():
+            posicoes = self._positions[column].get(value, np.array([], dtype=np.intp))
+            a, b = np.searchsorted(posicoes, [lo, hi])
+            selecionadas.append(posicoes[a:b])
+        selecionadas.sort(key=len)
+        return reduce(
+            lambda x, y: np.intersect1d(x, y, assume_unique=True), selecionadas
+        )
+
+    def select(self, start=None, end=None, **values):
+        """Transações do período [start, end] com os valores pedidos em cada coluna.
+
+        start/end None desliga o filtro de período; colunas omitidas não filtram.
+        """
+        posicoes = self.positions(start, end, **values)
+        if isinstance(posicoes, slice):
+            return self.df.iloc[posicoes].copy()
+        return self.df.take(posicoes)
+
+    def rank(self, column, ascending=True):
+        """Posição de cada linha na ordenação estável pela coluna (NaN no fim), calculada uma vez"""
+        chave = (column, ascending)
+        if chave not in self._ranks:
+            ordem = (
+                self.df[column]
+                .reset_index(drop=True)
+                .sort_values(ascending=ascending, kind="stable", na_position="last")
+                .index.to_numpy()
+            )
+            posicao = np.empty(len(ordem), dtype=np.intp)
+            posicao[ordem] = np.arange(len(ordem))
+            self._ranks[chave] = posicao
+        return self._ranks[chave]
+
+    def sort_positions(self, positions, column, ascending=True):
+        """Posições (de linhas de df) reordenadas pela coluna, sem ordenar os valores de novo"""
+        posicoes = np.arange(len(self.df))[positions]
+        return posicoes[np.argsort(self.rank(column, ascending)[posicoes])]
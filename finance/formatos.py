@@ -0,0 +1,118 @@
+"""Formatação vetorizada de valores para as tabelas exibidas nas páginas.
+
+Produz o mesmo texto que f"R$ {x:,.2f}" e f"{x:.1f}%", sem uma chamada Python
+por linha: os dígitos saem de aritmética inteira do numpy, são escritos numa
+matriz de bytes (uma linha por valor, alinhada à direita) e a matriz é
+compactada direto num StringArray do Arrow. O arredondamento é o do Python
+(meio para o par, sobre o valor binário exato); os raros valores que ficam a
+um arredondamento de distância da casa de meio, e os muito grandes ou não
+finitos, são formatados pelo próprio Python.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Dígitos da parte inteira tratados pelo caminho vetorizado
+_DIGITOS = 15
+_POTENCIAS = 10 ** np.arange(1, _DIGITOS, dtype=np.int64)
+
+# Acima disso o valor escalado (centavos, décimos...) perde a precisão inteira
+_LIMITE = 2.0**52
+
+
+def _monta(unidades, negativo, decimais, milhares, prefixo, sufixo):
+    """Textos de inteiros já escalados (centavos, décimos...) como StringArray"""
+    inteiros = unidades // 10**decimais
+    prefixo = np.frombuffer(prefixo.encode("ascii"), dtype=np.uint8)
+    sufixo = np.frombuffer(sufixo.encode("ascii"), dtype=np.uint8)
+
+    # Colunas: prefixo | sinal e parte inteira (alinhada à direita) | .fração | sufixo
+    virgulas = (_DIGITOS - 1) // 3 if milhares else 0
+    inicio = len(prefixo)
+    fim = inicio + 1 + _DIGITOS + virgulas
+    largura = fim + (decimais + 1 if decimais else 0) + len(sufixo)
+    # Montada coluna a coluna (cada coluna contígua) e lida por linhas no fim
+    matriz = np.empty((largura, len(unidades)), dtype=np.uint8)
+    matriz[:inicio] = prefixo[:, None]
+    matriz[largura - len(sufixo) :] = sufixo[:, None]
+
+    # Dígitos da direita para a esquerda, com uma vírgula a cada três
+    restante = inteiros
+    coluna = fim - 1
+    for k in range(_DIGITOS):
+        if milhares and k and k % 3 == 0:
+            matriz[coluna] = ord(",")
+            coluna -= 1
+        restante, digito = np.divmod(restante, 10)
+        np.add(digito, ord("0"), out=matriz[coluna], casting="unsafe")
+        coluna -= 1
+    if decimais:
+        matriz[fim] = ord(".")
+        restante = unidades
+        for k in range(decimais):
+            restante, digito = np.divmod(restante, 10)
+            np.add(digito, ord("0"), out=matriz[fim + decimais - k], casting="unsafe")
+    digitos = np.searchsorted(_POTENCIAS, inteiros, side="right") + 1
+
+    # Primeira coluna usada da parte inteira (o sinal, se houver, logo antes)
+    usadas = digitos + ((digitos - 1) // 3 if milhares else 0) + negativo
+    primeira = fim - usadas
+    linhas = np.flatnonzero(negativo)
+    matriz[primeira[linhas], linhas] = ord("-")
+
+    manter = (np.arange(largura) < inicio) | (np.arange(largura) >= primeira[:, None])
+    offsets = np.zeros(len(unidades) + 1, dtype=np.int64)
+    np.cumsum(largura - (primeira - inicio), out=offsets[1:])
+    return pa.LargeStringArray.from_buffers(
+        len(unidades), pa.py_buffer(offsets), pa.py_buffer(matriz.T[manter])
+    ).cast(pa.string())
+
+
+def format_number(valores, decimais=2, milhares=True, prefixo="", sufixo=""):
+    """Formata uma Series numérica como f"{prefixo}{x:,.{decimais}f}{sufixo}" (Series de string)"""
+    valores = pd.Series(valores)
+    numeros = valores.to_numpy(dtype="float64", na_value=np.nan)
+
+    escalados = np.abs(numeros) * 10**decimais
+    # Perto de ...,5 o produto em ponto flutuante pode arredondar diferente do
+    # valor exato; esses, os não finitos e os grandes demais vão pelo Python
+    with np.errstate(invalid="ignore"):
+        python = (
+            ~np.isfinite(escalados)
+            | (escalados >= min(_LIMITE, 10.0 ** (_DIGITOS + decimais)))
+            | (np.abs(escalados - np.floor(escalados) - 0.5) < 1e-6)
+        )
+    unidades = np.round(np.where(python, 0, escalados)).astype(np.int64)
+
+    textos = _monta(unidades, np.signbit(numeros), decimais, milhares, prefixo, sufixo)
+    if python.any():
+        formato = f"{{:{',' if milhares else ''}.{decimais}f}}"
+        textos = pc.replace_with_mask(
+            textos,
+            pa.array(python),
+            pa.array([prefixo + formato.format(x) + sufixo for x in numeros[python]]),
+        )
+    return pd.Series(
+        pd.arrays.ArrowStringArray(textos), index=valores.index, name=valores.name
+    )
+
+
+def brl(valores):
+    """Valores em reais como "R$ 1,234.56" (o formato usado nas páginas)"""
+    return format_number(valores, 2, milhares=True, prefixo="R$ ")
+
+
+def percent(valores):
+    """Percentuais como "12.3%" """
+    return format_number(valores, 1, milhares=False, sufixo="%")
+
+
+def dates(valores, formato="%d/%m/%Y"):
+    """Datas como texto (strftime do Arrow, <NA> nas faltantes)"""
+    valores = pd.Series(valores)
+    textos = pc.strftime(pa.array(valores, type=pa.timestamp("ns")), format=formato)
+    return pd.Series(
+        pd.arrays.ArrowStringArray(textos), index=valores.index, name=valores.name
+    )
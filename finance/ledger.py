@@ -0,0 +1,308 @@
+"""Snapshot colunar (Parquet) das abas mensais de data/data.xlsx.
+
+Cada aba da planilha é convertida uma única vez para um arquivo Parquet em
+data/.cache/ledger/. O manifesto guarda o mtime/tamanho da planilha e um hash
+do conteúdo de cada aba: se a planilha não mudou, nenhuma aba é lida; se mudou,
+só as abas cujo hash mudou (por exemplo, um mês recém-adicionado) são
+convertidas de novo com o openpyxl. Cada sincronização que lê a planilha
+registra suas métricas (finance/metricas.py) no manifesto e no log de ingestão.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+from finance import currency, metricas, storage
+
+LEDGER_PATH = os.path.join("data", "data.xlsx")
+SNAPSHOT_DIR = os.path.join("data", ".cache", "ledger")
+MANIFEST_NAME = "manifest.json"
+
+# Incrementar quando a forma de converter as abas mudar, para invalidar snapshots antigos
+SNAPSHOT_VERSION = 1
+
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_SHARED_STRING_CELL = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+
+
+def _workbook_sheets(zf):
+    """Lista (nome da aba, caminho do XML no pacote) na ordem da planilha"""
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    targets = {}
+    for rel in rels.iter(f"{_NS_PKG_REL}Relationship"):
+        target = rel.get("Target")
+        if target.startswith("/"):
+            target = target.lstrip("/")
+        else:
+            target = posixpath.normpath(posixpath.join("xl", target))
+        targets[rel.get("Id")] = target
+
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    return [
+        (sheet.get("name"), targets[sheet.get(f"{_NS_REL}id")])
+        for sheet in workbook.iter(f"{_NS_MAIN}sheet")
+    ]
+
+
+def _shared_strings(zf):
+    """Lê a tabela de strings compartilhadas da planilha"""
+    try:
+        data = zf.read("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+    root = ET.fromstring(data)
+    return [
+        "".join(t.text or "" for t in si.iter(f"{_NS_MAIN}t"))
+        for si in root.iter(f"{_NS_MAIN}si")
+    ]
+
+
+def sheet_digests(workbook_path=LEDGER_PATH):
+    """Calcula um hash do conteúdo de cada aba sem passar pelo openpyxl.
+
+    O hash cobre o XML da aba e o texto das strings compartilhadas que ela
+    referencia, então acrescentar uma aba nova não altera o hash das demais.
+    """
+    digests = {}
+    with zipfile.ZipFile(workbook_path) as zf:
+        strings = _shared_strings(zf)
+        for name, part in _workbook_sheets(zf):
+            xml = zf.read(part)
+            digest = hashlib.sha256(xml)
+            for index in _SHARED_STRING_CELL.findall(xml):
+                digest.update(strings[int(index)].encode("utf-8"))
+                digest.update(b"\x00")
+            digests[name] = digest.hexdigest()
+    return digests
+
+
+def _write_sheet(df, snapshot_dir, digest):
+    """Grava uma aba no snapshot; usa pickle quando o Parquet não aceita o conteúdo"""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=snapshot_dir, prefix=".tmp-")
+    os.close(fd)
+    try:
+        try:
+            df.to_parquet(tmp_path, index=False)
+            file_name = f"{digest}.parquet"
+        except (TypeError, ValueError, ImportError):
+            # Colunas com tipos misturados ou cabeçalhos não textuais não cabem no Parquet
+            df.to_pickle(tmp_path)
+            file_name = f"{digest}.pkl"
+        os.replace(tmp_path, os.path.join(snapshot_dir, file_name))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return file_name
+
+
+def sync_snapshot(
+    workbook_path=LEDGER_PATH,
+    snapshot_dir=SNAPSHOT_DIR,
+    remove_stale=True,
+    metrics_dir=metricas.METRICS_DIR,
+):
+    """Garante que o snapshot reflete a planilha atual e retorna o manifesto.
+
+    Quando mtime e tamanho da planilha batem com o manifesto, nada é lido
+    além do próprio manifesto. Caso contrário, recalcula os hashes por aba e
+    converte apenas as abas novas ou alteradas. Com remove_stale=False os
+    arquivos da versão anterior ficam no disco até prune_snapshot(). As
+    métricas da leitura (abas e linhas convertidas, tempo) vão para o log de
+    ingestão em metrics_dir e para ledger.prom: pages e transactions contam
+    só as abas mensais convertidas, lines todas as linhas lidas.
+    """
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    manifest = storage.load_manifest(manifest_path)
+    if manifest.get("snapshot_version") != SNAPSHOT_VERSION:
+        manifest = {}
+
+    stat = os.stat(workbook_path)
+    workbook_info = {"mtime": stat.st_mtime, "size": stat.st_size}
+    if manifest.get("workbook") == workbook_info:
+        return manifest
+
+    metrics = metricas.FileMetrics(
+        os.path.basename(workbook_path), "planilha", stat.st_size
+    )
+    with metricas.measure(metrics):
+        digests = sheet_digests(workbook_path)
+        previous = manifest.get("sheets", {})
+        sheets = {}
+        changed = []
+        for name, digest in digests.items():
+            entry = previous.get(name)
+            if (
+                entry
+                and entry["digest"] == digest
+                and os.path.exists(os.path.join(snapshot_dir, entry["file"]))
+            ):
+                sheets[name] = entry
+            else:
+                changed.append(name)
+
+        if changed:
+            frames = pd.read_excel(workbook_path, sheet_name=changed)
+            for name in changed:
+                file_name = _write_sheet(frames[name], snapshot_dir, digests[name])
+                sheets[name] = {"digest": digests[name], "file": file_name}
+                metrics.lines += len(frames[name])
+                # Só as abas mensais viram lançamentos; "Resumo" e afins são ignoradas
+                if _is_period(name):
+                    metrics.pages += 1
+                    metrics.transactions += len(frames[name])
+
+    version = hashlib.sha256()
+    for name in digests:
+        version.update(f"{name}\x00{digests[name]}\x00".encode("utf-8"))
+
+    manifest = {
+        "snapshot_version": SNAPSHOT_VERSION,
+        "workbook": workbook_info,
+        "order": list(digests),
+        "sheets": sheets,
+        "version": version.hexdigest(),
+        "metrics": metrics.record(),
+    }
+    storage.save_manifest(manifest_path, manifest)
+    metricas.write("ledger", [manifest["metrics"]], [manifest["metrics"]], metrics_dir)
+    if remove_stale:
+        prune_snapshot(manifest, snapshot_dir)
+    return manifest
+
+
+def prune_snapshot(manifest, snapshot_dir=SNAPSHOT_DIR):
+    """Remove do snapshot os arquivos de abas que o manifesto não usa mais"""
+    keep = {entry["file"] for entry in manifest.get("sheets", {}).values()}
+    for file_name in os.listdir(snapshot_dir):
+        if file_name.endswith((".parquet", ".pkl")) and file_name not in keep:
+            try:
+                os.remove(os.path.join(snapshot_dir, file_name))
+            except FileNotFoundError:
+                pass
+
+
+def _is_period(name):
+    """Abas mensais são as que têm dígitos no nome"""
+    return any(c.isdigit() for c in name)
+
+
+def period_names(manifest):
+    """Retorna as abas cujo nome contém dígitos (os períodos mensais), na ordem da planilha"""
+    return [name for name in manifest.get("order", []) if _is_period(name)]
+
+
+def read_sheet(manifest, sheet_name, snapshot_dir=SNAPSHOT_DIR):
+    """Lê uma aba a partir do snapshot"""
+    file_name = manifest["sheets"][sheet_name]["file"]
+    path = os.path.join(snapshot_dir, file_name)
+    if file_name.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def build_ledger_frame(manifest, snapshot_dir=SNAPSHOT_DIR):
+    """Junta todas as abas mensais em um único DataFrame longo com a coluna Periodo.
+
+    Periodo é categórica e ordenada na ordem das abas da planilha, então um
+    único groupby("Periodo") produz os números de todos os períodos. No modo
+    centavos (FINANCE_MONEY_CENTS=1), Valor e Rendimento viram centavos Int64.
+    """
+    periods = period_names(manifest)
+    frames = [
+        read_sheet(manifest, name, snapshot_dir).assign(Periodo=name)
+        for name in periods
+    ]
+    if not frames:
+        return pd.DataFrame({"Periodo": pd.Categorical([], categories=periods)})
+    frame = pd.concat(frames, ignore_index=True)
+    frame["Periodo"] = pd.Categorical(
+        frame["Periodo"], categories=periods, ordered=True
+    )
+    if currency.CENTS_MODE:
+        for column in ("Valor", "Rendimento"):
+            if column in frame:
+                frame[column] = currency.to_cents(frame[column])
+    return frame
+
+
+# Palavras em "Finalidade" que identificam o pagamento de uma fatura de cartão
+CREDIT_CARD_KEYWORDS = [
+    "card",
+    "cartão",
+    "itau",
+    "pedralli",
+    "caixa",
+    "nubank",
+    "santander",
+    "bradesco",
+]
+
+
+# Colunas da tabela de indicadores que são valores em dinheiro
+COLUNAS_KPI_MONETARIAS = [
+    "Renda",
+    "Despesa",
+    "Bills Pagas",
+    "Não Pagas",
+    "Gastos Cartão",
+    "Economia",
+    "Outras Despesas",
+]
+
+
+def build_kpi_table(frame):
+    """Calcula os indicadores mensais (uma linha por Periodo) a partir do frame longo.
+
+    No modo centavos todas as somas são inteiras; os valores só viram reais
+    no fim, já agregados.
+    """
+    is_paid = frame["Pago"] == "Sim"
+    is_credit_card = (
+        frame["Finalidade"]
+        .astype("string")
+        .str.lower()
+        .str.contains("|".join(CREDIT_CARD_KEYWORDS), na=False)
+    )
+    kpis = (
+        frame.assign(
+            Valor_Pago=frame["Valor"].where(is_paid),
+            Valor_Nao_Pago=frame["Valor"].where(~is_paid),
+            Valor_Cartao=frame["Valor"].where(is_credit_card),
+        )
+        .groupby("Periodo", observed=False)
+        .agg(
+            **{
+                "Renda": ("Rendimento", "sum"),
+                "Despesa": ("Valor", "sum"),
+                "Bills Pagas": ("Valor_Pago", "sum"),
+                "Não Pagas": ("Valor_Nao_Pago", "sum"),
+                "Gastos Cartão": ("Valor_Cartao", "sum"),
+            }
+        )
+    )
+    kpis.index = kpis.index.astype(str)
+
+    kpis["Economia"] = kpis["Renda"] - kpis["Despesa"]
+    kpis["Outras Despesas"] = kpis["Despesa"] - kpis["Gastos Cartão"]
+    kpis["Taxa de Economia (%)"] = _percent(kpis["Economia"], kpis["Renda"])
+    kpis["Percentual Cartão (%)"] = _percent(kpis["Gastos Cartão"], kpis["Despesa"])
+    kpis["Percentual Pagas (%)"] = _percent(kpis["Bills Pagas"], kpis["Despesa"])
+    kpis["Taxa de Pagamento (%)"] = _percent(
+        kpis["Bills Pagas"], kpis["Bills Pagas"] + kpis["Não Pagas"]
+    )
+    return currency.in_reais(kpis, COLUNAS_KPI_MONETARIAS)
+
+
+def _percent(part, total):
+    """Percentual de part sobre total, 0 quando o total não é positivo"""
+    return (part / total * 100).where(total > 0, 0.0).astype("float64")
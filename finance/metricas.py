@@ -0,0 +1,178 @@
+"""Métricas por arquivo da ingestão das faturas e da planilha, legíveis por máquina.
+
+Cada fatura processada, e cada sincronização da planilha que lê abas, gera
+um FileMetrics com os bytes, páginas (ou abas), linhas examinadas,
+correspondências das expressões regulares, transações, descartes por motivo,
+uso do caminho alternativo, erro de leitura, tempo de relógio e, com
+FINANCE_METRICS_MEMORY=1, o pico de memória alocada durante o arquivo (medido
+pelo tracemalloc, que deixa a ingestão mais lenta).
+
+Os registros novos são acrescentados a ingestao.jsonl, uma linha JSON por
+arquivo processado. O último registro de cada arquivo fica no manifesto da
+origem, e a cada sincronização com mudanças o arquivo <origem>.prom é
+regravado no formato texto do Prometheus. Os dois ficam em
+FINANCE_METRICS_DIR, onde um coletor local (como o textfile collector do
+node_exporter) pode lê-los.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+from finance import storage
+
+# Grava as métricas de ingestão (JSON lines e Prometheus)
+METRICS_ENABLED = os.environ.get("FINANCE_METRICS", "1") == "1"
+# Mede o pico de memória de cada arquivo com o tracemalloc
+MEMORY = os.environ.get("FINANCE_METRICS_MEMORY", "0") == "1"
+METRICS_DIR = os.environ.get(
+    "FINANCE_METRICS_DIR", os.path.join("data", ".cache", "metrics")
+)
+LOG_NAME = "ingestao.jsonl"
+
+# Métricas do arquivo .prom: (nome, campo do registro, descrição)
+_GAUGES = [
+    ("finance_ingest_bytes", "bytes", "Tamanho do arquivo ingerido"),
+    ("finance_ingest_pages", "pages", "Páginas (PDF) ou abas (planilha) lidas"),
+    ("finance_ingest_lines", "lines", "Linhas examinadas pelo parser"),
+    ("finance_ingest_matches", "matches", "Correspondências das expressões regulares"),
+    ("finance_ingest_transactions", "transactions", "Transações extraídas"),
+    ("finance_ingest_fallback", "fallback", "1 se usou o caminho alternativo"),
+    ("finance_ingest_failed", "failed", "1 se o arquivo não pôde ser lido"),
+    ("finance_ingest_seconds", "seconds", "Tempo de relógio da ingestão"),
+    ("finance_ingest_peak_memory_bytes", "peak_memory_bytes", "Pico de memória"),
+    ("finance_ingest_timestamp_seconds", "timestamp", "Momento da ingestão (epoch)"),
+]
+
+
+class FileMetrics:
+    """Contadores da ingestão de um arquivo, preenchidos pelos parsers"""
+
+    def __init__(self, file, kind, size=0):
+        self.file = file
+        self.kind = kind
+        self.bytes = size
+        self.pages = 0
+        self.lines = 0
+        self.matches = 0
+        self.transactions = 0
+        self.rejected = Counter()
+        self.fallback = False
+        self.error = None
+        self.seconds = 0.0
+        self.peak_memory_bytes = None
+        self.timestamp = None
+
+    def reject(self, reason, count=1):
+        """Conta linhas ou correspondências descartadas pelo motivo"""
+        self.rejected[reason] += count
+
+    def record(self):
+        """Registro JSON do arquivo"""
+        return {
+            "timestamp": self.timestamp,
+            "file": self.file,
+            "kind": self.kind,
+            "bytes": self.bytes,
+            "pages": self.pages,
+            "lines": self.lines,
+            "matches": self.matches,
+            "transactions": self.transactions,
+            "rejected": dict(self.rejected),
+            "fallback": self.fallback,
+            "failed": self.error is not None,
+            "error": self.error,
+            "seconds": round(self.seconds, 6),
+            "peak_memory_bytes": self.peak_memory_bytes,
+        }
+
+
+@contextmanager
+def measure(metrics):
+    """Mede o tempo (e, com FINANCE_METRICS_MEMORY=1, o pico de memória) do bloco"""
+    rastrear = MEMORY and not tracemalloc.is_tracing()
+    if rastrear:
+        tracemalloc.start()
+    if MEMORY:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.seconds = time.perf_counter() - start
+        metrics.timestamp = time.time()
+        if MEMORY:
+            metrics.peak_memory_bytes = tracemalloc.get_traced_memory()[1] - base
+        if rastrear:
+            tracemalloc.stop()
+
+
+def append_log(records, metrics_dir=METRICS_DIR):
+    """Acrescenta os registros, um por linha, ao ingestao.jsonl"""
+    if not records:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    with open(os.path.join(metrics_dir, LOG_NAME), "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _label(valor):
+    """Valor de label escapado no formato texto do Prometheus"""
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(valor):
+    """Valor de uma amostra: inteiro quando exato, senão o float completo"""
+    valor = float(valor)
+    return str(int(valor)) if valor.is_integer() else repr(valor)
+
+
+def _labels(source, record, **extras):
+    """Labels de uma amostra: origem, arquivo, tipo e os extras"""
+    pares = {"source": source, "file": record["file"], "kind": record["kind"], **extras}
+    return ",".join(f'{chave}="{_label(valor)}"' for chave, valor in pares.items())
+
+
+def prometheus_text(source, records):
+    """Métricas do último registro de cada arquivo no formato texto do Prometheus"""
+    linhas = []
+    for nome, campo, descricao in _GAUGES:
+        amostras = [
+            f"{nome}{{{_labels(source, record)}}} {_number(record[campo])}"
+            for record in records
+            if record.get(campo) is not None
+        ]
+        if amostras:
+            linhas += [f"# HELP {nome} {descricao}", f"# TYPE {nome} gauge", *amostras]
+
+    amostras = [
+        f"finance_ingest_rejected{{{_labels(source, record, reason=motivo)}}} {total}"
+        for record in records
+        for motivo, total in sorted(record["rejected"].items())
+    ]
+    if amostras:
+        linhas += [
+            "# HELP finance_ingest_rejected Linhas ou correspondências descartadas",
+            "# TYPE finance_ingest_rejected gauge",
+            *amostras,
+        ]
+    return "\n".join(linhas) + "\n"
+
+
+def write(source, new_records, latest_records, metrics_dir=METRICS_DIR):
+    """Grava os registros novos no JSON lines e regrava <source>.prom com os mais recentes
+
+    Com metrics_dir=None (ou FINANCE_METRICS=0) nada é gravado.
+    """
+    if not METRICS_ENABLED or metrics_dir is None:
+        return
+    append_log(new_records, metrics_dir)
+    storage.atomic_write_bytes(
+        os.path.join(metrics_dir, f"{source}.prom"),
+        prometheus_text(source, latest_records).encode("utf-8"),
+    )
@@ -0,0 +1,59 @@
+"""Colunas de parcelamento das transações do cartão ("03 de 10" na coluna Parcela).
+
+Um único str.extract, feito só sobre os valores distintos da coluna, separa
+parcela atual e total de parcelas em inteiros anuláveis; o restante é
+aritmética de colunas, sem apply linha a linha.
+"""
+
+import numpy as np
+import pandas as pd
+
+PADRAO_PARCELA = r"(\d+) de (\d+)"
+
+
+def split_parcela(parcela):
+    """Separa a coluna Parcela em Parcela_Atual e Total_Parcelas (Int64, <NA> se à vista)
+
+    A coluna tem poucos valores distintos ("-", "01 de 10", ...), então o
+    extract roda só sobre eles e o resultado volta às linhas pelos códigos.
+    """
+    codes, uniques = pd.factorize(parcela)
+    partes = pd.Series(uniques, dtype=object).str.extract(PADRAO_PARCELA)
+    partes = partes.astype("float64").to_numpy()
+    # Código -1 (Parcela vazia) aponta para a linha extra de NaN
+    partes = np.vstack([partes, np.full((1, 2), np.nan)])[codes]
+    return pd.DataFrame(
+        {
+            "Parcela_Atual": pd.array(partes[:, 0], dtype="Int64"),
+            "Total_Parcelas": pd.array(partes[:, 1], dtype="Int64"),
+        },
+        index=parcela.index,
+    )
+
+
+def add_columns(df):
+    """Acrescenta as colunas de parcelamento ao DataFrame de transações.
+
+    - É_Parcelado: a Parcela tem o formato "N de M"
+    - Parcela_Atual, Total_Parcelas: N e M
+    - Valor_Total: valor da compra inteira (Valor × Total_Parcelas nas parceladas)
+    - Valor_Restante: parcelas ainda por vir (Valor × (Total_Parcelas - Parcela_Atual))
+
+    Com Valor em centavos (Int64) as duas colunas de valor também ficam em
+    centavos, calculadas só com inteiros.
+    """
+    partes = split_parcela(df["Parcela"])
+    atual = partes["Parcela_Atual"]
+    total = partes["Total_Parcelas"]
+    restantes = (total - atual).clip(lower=0)
+    parcelado = total.notna().to_numpy()
+    if not pd.api.types.is_integer_dtype(df["Valor"].dtype):
+        total = total.astype("float64")
+        restantes = restantes.astype("float64")
+
+    df["É_Parcelado"] = parcelado
+    df["Parcela_Atual"] = partes["Parcela_Atual"]
+    df["Total_Parcelas"] = partes["Total_Parcelas"]
+    df["Valor_Total"] = df["Valor"].where(~parcelado, df["Valor"] * total)
+    df["Valor_Restante"] = (df["Valor"] * restantes).where(parcelado, 0)
+    return df
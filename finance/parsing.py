@@ -0,0 +1,288 @@
+"""Parser das linhas de texto das faturas PDF (padrão Itaú), sem dependência do Streamlit.
+
+Todas as expressões regulares são compiladas uma vez, no carregamento do
+módulo. O cache acontece por arquivo inteiro, no manifesto de
+finance/faturas.py, e não mais linha a linha com st.cache_data.
+"""
+
+import re
+import unicodedata
+
+# Padrão 1: DATA + ESTABELECIMENTO + VALOR, como "28/11 APPLE.COM/BILL 7,99"
+_DATA_PRIMEIRO = re.compile(
+    r"(\d{2}/\d{2})\s+([A-Z][A-Z\s\.\*\-/]+?)\s+(\d+(?:,\d{2})?)"
+)
+# Padrão 2: ESTABELECIMENTO + DATA + VALOR, como "APPLE.COM/BILL 28/11 7,99"
+_ESTAB_PRIMEIRO = re.compile(
+    r"([A-Z][A-Z\s\.\*\-/]+?)\s+(\d{2}/\d{2})\s+(\d+(?:,\d{2})?)"
+)
+
+_TITULAR = re.compile(r"Titular\s+([A-Z\s]+)")
+_CARTAO = re.compile(r"Cart[aã]o\s+.*(\d{4})")
+
+_TEM_DIGITO = re.compile(r"\d")
+_TEM_LETRA = re.compile(r"[A-Za-z]")
+_NAO_NUMERICO = re.compile(r"[^0-9.,-]")
+
+# Termos que indicam linhas de resumo/cabeçalho da fatura, e não compras
+TERMOS_IGNORAR = [
+    "lançamentos",
+    "lançamentosnocartão",
+    "lançamentosinternacionais",
+    "total",
+    "saldo",
+    "pagamento",
+    "fatura",
+    "seguro",
+    "iof",
+    "cet",
+    "juros",
+    "multa",
+    "anterior",
+    "atual",
+    "proximo",
+    "vencimento",
+    "limite",
+    "disponivel",
+    "produtos",
+    "serviços",
+    "compras",
+    "parceladas",
+    "demais",
+    "faturas",
+    "próximas",
+    "estorno",
+    "anuidade",
+    "diferencia",
+    "previsão",
+    "período",
+    "processo",
+    "seguradora",
+    "corretora",
+    "cnpj",
+    "cpf",
+    "documento",
+    "número",
+]
+_TERMOS_IGNORAR = re.compile("|".join(re.escape(termo) for termo in TERMOS_IGNORAR))
+
+# Quebras de linha, tabs e aspas tipográficas são removidas; o espaço fino vira espaço
+_TRADUCAO_VALOR = str.maketrans(
+    {"\n": None, "\r": None, "\t": None, "′": None, "″": None, "\u202f": " "}
+)
+
+
+def normaliza_valor(valor):
+    """Converte um valor no formato brasileiro ("1.234,56", "R$ 7,99") para string com ponto decimal"""
+    valor = str(valor).strip()
+
+    # Remover caracteres especiais, quebras de linha e o símbolo da moeda
+    valor = valor.translate(_TRADUCAO_VALOR)
+    valor = valor.replace("R$", "").replace("R", "").replace("$", "")
+
+    # Remover espaços extras
+    valor = valor.strip()
+
+    # Se o valor estiver vazio ou não contiver números, retornar 0
+    if not valor or not _TEM_DIGITO.search(valor):
+        return "0"
+
+    # Remove qualquer caractere que não seja número, ponto, vírgula ou sinal de menos
+    valor = _NAO_NUMERICO.sub("", valor)
+
+    # Handle negative values
+    is_negative = valor.startswith("-")
+    if is_negative:
+        valor = valor[1:]  # Remove the minus sign temporarily
+
+    # Handle Brazilian number format (dots as thousands separators, comma as decimal)
+    if "," in valor:
+        # If there's a comma, it's the decimal separator
+        valor = valor.replace(".", "").replace(",", ".")
+    elif valor.count(".") > 1:
+        # Multiple dots means dots are thousands separators
+        last_dot = valor.rfind(".")
+        valor = valor[:last_dot].replace(".", "") + "." + valor[last_dot + 1 :]
+    elif valor.count(".") == 1:
+        # Single dot - if the part after it has 3 digits, it's a thousands separator (e.g., 1.374)
+        parts = valor.split(".")
+        if len(parts) == 2 and len(parts[1]) == 3:
+            valor = valor.replace(".", "")
+
+    # Restore negative sign if needed
+    if is_negative:
+        valor = "-" + valor
+
+    return valor
+
+
+# Meses no formato de normaliza_mes, em ordem
+MESES = [
+    "janeiro",
+    "fevereiro",
+    "marco",
+    "abril",
+    "maio",
+    "junho",
+    "julho",
+    "agosto",
+    "setembro",
+    "outubro",
+    "novembro",
+    "dezembro",
+]
+MESES_ORDEM = {mes: numero for numero, mes in enumerate(MESES, start=1)}
+
+
+def normaliza_mes(mes):
+    """Nome do mês em minúsculas e sem acentos ("Março" -> "marco")"""
+    if not isinstance(mes, str):
+        return mes
+    mes = mes.lower().strip()
+    return "".join(
+        c for c in unicodedata.normalize("NFD", mes) if unicodedata.category(c) != "Mn"
+    )
+
+
+def _avalia(estab, valor):
+    """Retorna (valor como float, None) se a transação for válida, senão (None, motivo)"""
+    # Ignorar estabelecimentos vazios ou só símbolos
+    if not estab or not _TEM_LETRA.search(estab):
+        return None, "sem_estabelecimento"
+
+    if _TERMOS_IGNORAR.search(estab.lower()):
+        return None, "termo_ignorado"
+
+    # Verificar se o valor é válido (não é apenas números de data)
+    try:
+        valor_float = float(normaliza_valor(valor))
+    except ValueError:
+        return None, "valor_invalido"
+    # Ignorar valores muito pequenos (menos de 1 real) ou muito grandes (mais de 10000)
+    if valor_float < 1.0 or valor_float > 10000.0:
+        return None, "valor_fora_da_faixa"
+    return valor_float, None
+
+
+def is_valid_transaction(estab, valor):
+    """Verifica se a transação é válida baseada no estabelecimento e valor"""
+    return _avalia(estab, valor)[0] is not None
+
+
+def _extract(line, portador, cartao, filename, mes, ano, metrics=None):
+    """Aplica os dois padrões de transação a uma linha"""
+    if "itau" in filename.lower():
+        portador = "Jorge Leite"
+        cartao = "Itaú"
+
+    transacoes = []
+    matches = 0
+    for pattern, data_first in ((_DATA_PRIMEIRO, True), (_ESTAB_PRIMEIRO, False)):
+        for match in pattern.finditer(line):
+            matches += 1
+            if data_first:
+                data, estab, valor = match.groups()
+            else:
+                estab, data, valor = match.groups()
+            estab = estab.strip()
+
+            valor_float, motivo = _avalia(estab, valor)
+            if valor_float is None:
+                if metrics is not None:
+                    metrics.reject(motivo)
+                continue
+
+            dia, mes_ = data.split("/")
+            transacoes.append(
+                {
+                    "Data": f"{dia}/{mes_}/{ano}",
+                    "Estabelecimento": estab,
+                    "Portador": portador,
+                    "Valor": valor_float,
+                    "Parcela": "-",
+                    "Arquivo_Fonte": filename,
+                    "Mes_Fatura": mes,
+                    "Cartao": cartao,
+                }
+            )
+    if metrics is not None:
+        metrics.matches += matches
+        if not matches and line.strip():
+            metrics.reject("sem_padrao")
+    return transacoes
+
+
+def extract_transactions(
+    line, portador, final_cartao, filename, mes, ano, metrics=None
+):
+    """Extrai as transações de uma linha; exige portador e cartão já detectados"""
+    # Ignorar se portador ou cartão não foram detectados
+    if not portador or not final_cartao:
+        if metrics is not None and line.strip():
+            metrics.reject("sem_portador")
+        return []
+    return _extract(line, portador.title(), final_cartao, filename, mes, ano, metrics)
+
+
+def extract_transactions_alternative(line, filename, mes, ano, metrics=None):
+    """Função alternativa para extrair transações sem verificar portador/cartão"""
+    return _extract(line, "Desconhecido", "Desconhecido", filename, mes, ano, metrics)
+
+
+def parse_statement_pages(page_texts, filename, mes, ano, metrics=None):
+    """Extrai as transações do texto de todas as páginas de uma fatura.
+
+    As linhas são percorridas em ordem, página após página, então o portador
+    e o cartão detectados no fim de uma página continuam valendo na seguinte.
+    Se nenhuma transação for encontrada assim, tenta de novo sem exigir
+    portador/cartão. Retorna (transações, usou_alternativa).
+
+    Com metrics (um metricas.FileMetrics), conta as linhas examinadas, as
+    correspondências dos padrões e as linhas ou correspondências descartadas
+    por motivo, nas duas passadas.
+    """
+    rows = []
+    portador = None
+    final_cartao = None
+
+    for text in page_texts:
+        if not text:
+            continue
+
+        for line in text.split("\n"):
+            if metrics is not None:
+                metrics.lines += 1
+            stripped = line.strip()
+
+            # Detectar portador pelo padrão Itaú
+            m_portador = _TITULAR.match(stripped)
+            if m_portador:
+                portador = m_portador.group(1).strip()
+                continue
+
+            # Detectar final do cartão pelo padrão Itaú
+            m_cartao = _CARTAO.match(stripped)
+            if m_cartao:
+                final_cartao = m_cartao.group(1)
+                continue
+
+            rows.extend(
+                extract_transactions(
+                    line, portador, final_cartao, filename, mes, ano, metrics
+                )
+            )
+
+    if rows:
+        return rows, False
+
+    alt_rows = []
+    for text in page_texts:
+        if not text:
+            continue
+        for line in text.split("\n"):
+            if metrics is not None:
+                metrics.lines += 1
+            alt_rows.extend(
+                extract_transactions_alternative(line, filename, mes, ano, metrics)
+            )
+    return alt_rows, True
@@ -0,0 +1,100 @@
+"""Extração do texto das páginas das faturas PDF, opcionalmente em paralelo.
+
+O trabalho caro da ingestão de PDFs é o page.extract_text() do pdfplumber.
+Este módulo divide arquivos e páginas em fatias e distribui essas fatias em
+um ProcessPoolExecutor. Os textos voltam sempre na ordem das páginas, então o
+resultado não depende da ordem em que os processos terminam. Não importa o
+Streamlit, para que os processos filhos subam rápido.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+
+# Número de processos da ingestão paralela; 1 mantém tudo no processo atual
+INGEST_WORKERS = int(os.environ.get("FINANCE_INGEST_WORKERS", "1"))
+
+# Quantidade de páginas de um mesmo PDF enviadas a cada tarefa do pool
+PAGES_PER_TASK = int(os.environ.get("FINANCE_PAGES_PER_TASK", "8"))
+
+logger = logging.getLogger(__name__)
+
+
+def page_count(file_path):
+    """Número de páginas de um PDF"""
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_pages(file_path, start=0, stop=None):
+    """Extrai o texto das páginas [start, stop) de um PDF (None para páginas sem texto)"""
+    with pdfplumber.open(file_path) as pdf:
+        return [page.extract_text() for page in pdf.pages[start:stop]]
+
+
+def extract_texts(file_paths, workers=INGEST_WORKERS, pages_per_task=PAGES_PER_TASK):
+    """Extrai o texto de todas as páginas de vários PDFs.
+
+    Retorna um dicionário caminho -> lista de textos por página, ou a exceção
+    levantada ao ler aquele arquivo. Com workers <= 1 roda no processo atual.
+    Se o pool quebrar (um processo morto ou que não conseguiu subir), os PDFs
+    ainda sem resultado são lidos no processo atual: a falha não é do arquivo.
+    """
+    if workers <= 1:
+        results = {}
+        for file_path in file_paths:
+            try:
+                results[file_path] = extract_pages(file_path)
+            except Exception as e:
+                results[file_path] = e
+        return results
+
+    tasks = {}
+    results = {}
+    for file_path in file_paths:
+        try:
+            count = page_count(file_path)
+        except Exception as e:
+            results[file_path] = e
+            continue
+        tasks[file_path] = [
+            (start, min(start + pages_per_task, count))
+            for start in range(0, count, pages_per_task)
+        ]
+
+    # spawn evita herdar as threads do servidor do Streamlit num fork
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {
+                file_path: [
+                    pool.submit(extract_pages, file_path, start, stop)
+                    for start, stop in ranges
+                ]
+                for file_path, ranges in tasks.items()
+            }
+            for file_path, file_futures in futures.items():
+                texts = []
+                try:
+                    for future in file_futures:
+                        texts.extend(future.result())
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    results[file_path] = e
+                    continue
+                results[file_path] = texts
+    except BrokenProcessPool as e:
+        restantes = [file_path for file_path in tasks if file_path not in results]
+        logger.warning(
+            "Pool da ingestão quebrou (%s); %d PDFs lidos no processo atual",
+            e,
+            len(restantes),
+        )
+        results.update(extract_texts(restantes, workers=1))
+
+    return {file_path: results[file_path] for file_path in file_paths}
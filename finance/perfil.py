@@ -0,0 +1,212 @@
+"""Tempo de cada etapa de uma execução das páginas e captura de perfil opcional.
+
+Cada página chama start() no começo e finish() no fim. switch() troca a etapa
+de nível mais alto da página (carregar, transformar, agregar, renderizar) e
+stage(), como gerenciador de contexto ou decorador, mede um trecho dentro
+dela, como os carregadores de finance/data.py e a montagem das figuras. As
+medições ficam numa variável local da thread, porque o Streamlit roda cada
+execução na thread de script da sessão; fora de start()/finish(), stage()
+não mede nada.
+
+finish() grava uma linha JSON no logger finance.perfil (nível INFO) com o
+total e as etapas; com FINANCE_PERF_LOG=1 o logger ganha um handler que
+escreve essas linhas no stderr. Com FINANCE_TIMINGS=1 as páginas mostram as
+etapas na barra lateral. Com FINANCE_PROFILER=cprofile (ou pyinstrument, se o pacote
+estiver instalado) cada execução é perfilada por inteiro e o resultado fica
+em data/.cache/profiles/.
+"""
+
+import cProfile
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+# Mostra o tempo de cada etapa na barra lateral das páginas
+TIMINGS = os.environ.get("FINANCE_TIMINGS", "0") == "1"
+# Perfil completo de cada execução: "cprofile" ou "pyinstrument"
+PROFILER = os.environ.get("FINANCE_PROFILER", "").lower()
+PROFILE_DIR = os.path.join("data", ".cache", "profiles")
+# Escreve a linha JSON de cada execução no stderr
+PERF_LOG = os.environ.get("FINANCE_PERF_LOG", "0") == "1"
+
+logger = logging.getLogger(__name__)
+# O Streamlit só configura os loggers streamlit.*; o logger guarda o handler
+# entre execuções e recargas do módulo, então ele é adicionado uma vez só
+if PERF_LOG and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+_local = threading.local()
+
+
+class Rerun:
+    """Etapas medidas de uma execução de página, na ordem em que começaram"""
+
+    def __init__(self, page):
+        self.page = page
+        self.stages = []
+        self.total = None
+        self.profile = None
+        self._start = time.perf_counter()
+        self._depth = 0
+        self._page_stage = None
+
+    @contextmanager
+    def stage(self, name):
+        """Mede o trecho como uma etapa, aninhada na que estiver aberta"""
+        etapa = {"name": name, "depth": self._depth, "seconds": 0.0}
+        self.stages.append(etapa)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            etapa["seconds"] = time.perf_counter() - start
+            self._depth -= 1
+
+    def switch(self, name):
+        """Fecha a etapa de página aberta (se houver) e abre a etapa name"""
+        self._close_page_stage()
+        self._page_stage = self.stage(name)
+        self._page_stage.__enter__()
+
+    def _close_page_stage(self):
+        if self._page_stage is not None:
+            self._page_stage.__exit__(None, None, None)
+            self._page_stage = None
+
+    def finish(self):
+        """Fecha a última etapa de página e registra o tempo total"""
+        self._close_page_stage()
+        self.total = time.perf_counter() - self._start
+
+    def record(self):
+        """Execução como dicionário (tempos em ms), no formato da linha de log"""
+        return {
+            "page": self.page,
+            "total_ms": round(self.total * 1000, 3),
+            "stages": [
+                {
+                    "name": etapa["name"],
+                    "depth": etapa["depth"],
+                    "ms": round(etapa["seconds"] * 1000, 3),
+                }
+                for etapa in self.stages
+            ],
+            "profile": self.profile,
+        }
+
+
+def current():
+    """Execução em andamento nesta thread, ou None"""
+    return getattr(_local, "rerun", None)
+
+
+def start(page):
+    """Começa a medir uma execução da página (o caminho do script ou um nome)"""
+    # Uma execução interrompida (st.stop, nova execução pedida no meio) não
+    # chega ao finish(); o perfilador que ela deixou ligado é descartado
+    anterior = getattr(_local, "profiler", None)
+    if anterior is not None:
+        _stop_profiler(anterior)
+    rerun = Rerun(os.path.splitext(os.path.basename(page))[0])
+    _local.rerun = rerun
+    _local.profiler = _start_profiler()
+    return rerun
+
+
+def switch(name):
+    """Passa a página para a etapa name (carregar, transformar, agregar, renderizar)"""
+    rerun = current()
+    if rerun is not None:
+        rerun.switch(name)
+
+
+@contextmanager
+def stage(name):
+    """Mede um trecho dentro da etapa atual; também serve de decorador"""
+    rerun = current()
+    if rerun is None:
+        yield
+        return
+    with rerun.stage(name):
+        yield
+
+
+def timed(func):
+    """Decorador que mede cada chamada de func como uma etapa com o nome dela"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def finish():
+    """Encerra a execução, grava o perfil (se ativo) e a linha de log; devolve a execução"""
+    rerun = current()
+    if rerun is None:
+        return None
+    _local.rerun = None
+    rerun.finish()
+    profiler, _local.profiler = _local.profiler, None
+    if profiler is not None:
+        rerun.profile = _save_profile(profiler, rerun.page)
+    logger.info(json.dumps(rerun.record(), ensure_ascii=False))
+    return rerun
+
+
+def _start_profiler():
+    """Liga o perfilador escolhido em FINANCE_PROFILER para a thread atual"""
+    if PROFILER == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if PROFILER == "pyinstrument":
+        if Profiler is None:
+            logger.warning(
+                "FINANCE_PROFILER=pyinstrument, mas o pacote não está instalado"
+            )
+            return None
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+    return None
+
+
+def _stop_profiler(profiler):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+    else:
+        profiler.stop()
+
+
+def _save_profile(profiler, page):
+    """Para o perfilador e grava o resultado em PROFILE_DIR; devolve o caminho"""
+    _stop_profiler(profiler)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(
+        PROFILE_DIR, f"{page}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+    )
+    if isinstance(profiler, cProfile.Profile):
+        path = f"{base}.prof"
+        profiler.dump_stats(path)
+    else:
+        path = f"{base}.html"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+    return path
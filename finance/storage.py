@@ -0,0 +1,45 @@
+"""Utilitários de persistência dos caches em disco (manifestos e snapshots)."""
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Calcula o SHA-256 do conteúdo de um arquivo, lendo em blocos"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def atomic_write_bytes(path, data):
+    """Grava bytes em um arquivo temporário e troca pelo destino de forma atômica"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_manifest(path):
+    """Lê um manifesto JSON; retorna um dicionário vazio se não existir ou estiver corrompido"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    """Grava o manifesto JSON de forma atômica"""
+    data = json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True)
+    atomic_write_bytes(path, data.encode("utf-8"))
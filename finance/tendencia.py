@@ -0,0 +1,110 @@
+"""Séries longas dos gráficos de tendência: WebGL e redução de pontos no servidor.
+
+Acima de WEBGL_POINTS pontos as linhas passam a Scattergl, desenhadas pelo
+WebGL do navegador em vez de um elemento SVG por ponto. Acima de MAX_POINTS a
+série é reduzida antes de entrar na figura: pelo LTTB (Largest-Triangle-
+Three-Buckets, que mantém a forma da linha) ou pelo mínimo e máximo de cada
+intervalo (que mantém os picos). Assim um histórico de vários anos, dia a dia,
+chega ao navegador com um número limitado de pontos.
+"""
+
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+# A partir deste número de pontos as linhas são desenhadas com WebGL
+WEBGL_POINTS = int(os.environ.get("FINANCE_TREND_WEBGL_POINTS", "1000"))
+# Máximo de pontos por série enviados ao navegador
+MAX_POINTS = int(os.environ.get("FINANCE_TREND_MAX_POINTS", "2000"))
+# Redução das séries longas: "lttb" ou "minmax"
+DOWNSAMPLE = os.environ.get("FINANCE_TREND_DOWNSAMPLE", "lttb")
+
+
+def _numeric(x):
+    """Eixo x como float64 (datas em nanossegundos; texto vira a posição)"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").view("int64").astype("float64")
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype("float64")
+    return np.arange(len(x), dtype="float64")
+
+
+def lttb(x, y, max_points):
+    """Posições dos pontos escolhidos pelo LTTB (o primeiro e o último sempre ficam)"""
+    tamanho = len(y)
+    if max_points >= tamanho or max_points < 3:
+        return np.arange(tamanho)
+    x = _numeric(x)
+    y = np.nan_to_num(np.asarray(y, dtype="float64"))
+
+    # O primeiro e o último ponto ficam sozinhos; o resto é dividido em
+    # max_points - 2 intervalos, e de cada um fica o ponto que forma o maior
+    # triângulo com o escolhido no intervalo anterior e a média do seguinte
+    limites = np.linspace(1, tamanho - 1, max_points - 1).astype(np.int64)
+    medias_x = np.append(np.add.reduceat(x[1:-1], limites[:-1] - 1), x[-1])
+    medias_y = np.append(np.add.reduceat(y[1:-1], limites[:-1] - 1), y[-1])
+    contagens = np.append(np.diff(limites), 1)
+    medias_x /= contagens
+    medias_y /= contagens
+
+    posicoes = np.empty(max_points, dtype=np.int64)
+    posicoes[0], posicoes[-1] = 0, tamanho - 1
+    anterior = 0
+    for k in range(max_points - 2):
+        inicio, fim = limites[k], limites[k + 1]
+        area = np.abs(
+            (x[anterior] - medias_x[k + 1]) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (medias_y[k + 1] - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(area))
+        posicoes[k + 1] = anterior
+    return posicoes
+
+
+def minmax(y, max_points):
+    """Posições do mínimo e do máximo de cada intervalo, mais o primeiro e o último ponto"""
+    tamanho = len(y)
+    if max_points >= tamanho or max_points < 4:
+        return np.arange(tamanho)
+    y = np.nan_to_num(np.asarray(y, dtype="float64"))
+
+    intervalos = (max_points - 2) // 2
+    limites = np.linspace(0, tamanho, intervalos + 1).astype(np.int64)
+    intervalo = np.repeat(np.arange(intervalos), np.diff(limites))
+    # Ordenadas por intervalo e, dentro dele, por valor: o mínimo e o máximo
+    # são a primeira e a última posição de cada intervalo
+    ordem = np.lexsort((y, intervalo))
+    return np.unique(
+        np.concatenate([[0, tamanho - 1], ordem[limites[:-1]], ordem[limites[1:] - 1]])
+    )
+
+
+def downsample(x, y, max_points=MAX_POINTS, method=DOWNSAMPLE):
+    """Posições (crescentes) dos pontos mantidos da série; todas se ela já é curta"""
+    if method == "minmax":
+        return minmax(y, max_points)
+    return lttb(x, y, max_points)
+
+
+def reduce_frame(df, x, y, max_points=MAX_POINTS, method=DOWNSAMPLE):
+    """Linhas de df mantidas pela redução da série (x, y), na ordem original"""
+    if len(df) <= max_points:
+        return df
+    return df.iloc[downsample(df[x].to_numpy(), df[y].to_numpy(), max_points, method)]
+
+
+def render_mode(points):
+    """render_mode do plotly express para uma linha com esse número de pontos"""
+    return "webgl" if points > WEBGL_POINTS else "svg"
+
+
+def line(x, y, **kwargs):
+    """Trace de linha (Scatter, ou Scattergl se for longa), com a série já reduzida"""
+    if len(y) > MAX_POINTS:
+        x, y = np.asarray(x), np.asarray(y)
+        posicoes = downsample(x, y)
+        x, y = x[posicoes], y[posicoes]
+    trace = go.Scattergl if len(y) > WEBGL_POINTS else go.Scatter
+    return trace(x=x, y=y, **kwargs)
@@ -0,0 +1,190 @@
+"""Ingestão em segundo plano das faturas e da planilha (opcional).
+
+Com FINANCE_WATCH=1 uma thread acompanha data/faturas/ e data/data.xlsx e
+roda ledger.sync_snapshot() e faturas.sync_faturas() fora das requisições.
+As páginas passam a ler o último manifesto pronto, trocado de uma vez sob
+um lock quando uma nova versão termina de ser gravada, e nunca esperam o
+pdfplumber (só a primeira carga, se ainda não houver manifesto no disco).
+
+Sem o pacote watchdog a pasta é verificada por polling a cada
+FINANCE_WATCH_INTERVAL segundos; as verificações são baratas porque os dois
+sync comparam mtime e tamanho antes de ler qualquer arquivo. Com o watchdog
+instalado, eventos do sistema de arquivos acordam a thread antes do prazo.
+"""
+
+import logging
+import os
+import threading
+
+from finance import faturas, ledger, storage
+
+# Liga a ingestão em segundo plano
+WATCH_ENABLED = os.environ.get("FINANCE_WATCH", "0") == "1"
+
+# Intervalo (s) entre verificações quando não há eventos do sistema de arquivos
+WATCH_INTERVAL = float(os.environ.get("FINANCE_WATCH_INTERVAL", "5"))
+
+# Espera (s) depois de um evento, para juntar as gravações de uma mesma cópia
+SETTLE_DELAY = 1.0
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+
+class _WakeHandler(FileSystemEventHandler):
+    """Acorda o watcher quando uma fatura ou a planilha muda"""
+
+    def __init__(self, wake, ledger_name):
+        super().__init__()
+        self._wake = wake
+        self._ledger_name = ledger_name
+
+    def on_any_event(self, event):
+        name = os.path.basename(event.src_path)
+        if name.startswith("fatura_") or name == self._ledger_name:
+            self._wake.set()
+
+
+class Watcher:
+    """Mantém os manifestos da planilha e das faturas sempre atualizados.
+
+    snapshot("ledger") e snapshot("faturas") devolvem o manifesto mais recente
+    sem bloquear. As peças da versão anterior só são apagadas na verificação
+    seguinte, para não sumirem embaixo de uma página que ainda as está lendo.
+    """
+
+    KINDS = ("ledger", "faturas")
+
+    def __init__(
+        self,
+        interval=WATCH_INTERVAL,
+        workbook_path=ledger.LEDGER_PATH,
+        snapshot_dir=ledger.SNAPSHOT_DIR,
+        faturas_dir=faturas.FATURAS_DIR,
+        cache_dir=faturas.CACHE_DIR,
+    ):
+        self.interval = interval
+        self.workbook_path = workbook_path
+        self.snapshot_dir = snapshot_dir
+        self.faturas_dir = faturas_dir
+        self.cache_dir = cache_dir
+
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._errors = {}
+        self._ready = {kind: threading.Event() for kind in self.KINDS}
+        self._prune = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+
+        # Manifestos de uma execução anterior já servem enquanto a primeira
+        # verificação roda
+        for kind, path in (
+            ("ledger", os.path.join(snapshot_dir, ledger.MANIFEST_NAME)),
+            ("faturas", os.path.join(cache_dir, faturas.MANIFEST_NAME)),
+        ):
+            manifest = storage.load_manifest(path)
+            if manifest.get("version"):
+                self._snapshots[kind] = manifest
+                self._ready[kind].set()
+
+    def start(self):
+        """Inicia a thread (e o observador do watchdog, se disponível)"""
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(
+            target=self._run, name="finance-watcher", daemon=True
+        )
+        self._thread.start()
+        if Observer is not None:
+            handler = _WakeHandler(self._wake, os.path.basename(self.workbook_path))
+            self._observer = Observer()
+            for path in {self.faturas_dir, os.path.dirname(self.workbook_path) or "."}:
+                if os.path.isdir(path):
+                    self._observer.schedule(handler, path, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Para a thread e o observador"""
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def snapshot(self, kind, timeout=None):
+        """Manifesto mais recente; só espera se ainda não houver nenhum"""
+        if not self._ready[kind].wait(timeout):
+            raise TimeoutError(f"Snapshot '{kind}' ainda não está pronto")
+        with self._lock:
+            if kind in self._errors and kind not in self._snapshots:
+                raise self._errors[kind]
+            return self._snapshots[kind]
+
+    def refresh(self):
+        """Uma verificação: apaga as peças antigas pendentes e sincroniza tudo"""
+        for kind in self._prune:
+            self._prune_kind(kind)
+        self._prune = set()
+
+        for kind in self.KINDS:
+            try:
+                manifest = self._sync(kind)
+            except Exception as e:
+                logger.exception("Falha ao sincronizar %s", kind)
+                with self._lock:
+                    self._errors[kind] = e
+                self._ready[kind].set()
+                continue
+
+            with self._lock:
+                previous = self._snapshots.get(kind, {})
+                self._snapshots[kind] = manifest
+                self._errors.pop(kind, None)
+            self._ready[kind].set()
+            if previous.get("version") != manifest["version"]:
+                logger.info("Nova versão de %s: %s", kind, manifest["version"][:12])
+                self._prune.add(kind)
+
+    def _sync(self, kind):
+        """Sincroniza um dos manifestos sem apagar os arquivos da versão anterior"""
+        if kind == "ledger":
+            return ledger.sync_snapshot(
+                self.workbook_path, self.snapshot_dir, remove_stale=False
+            )
+        return faturas.sync_faturas(
+            self.faturas_dir, self.cache_dir, remove_stale=False
+        )
+
+    def _prune_kind(self, kind):
+        """Apaga os arquivos que o manifesto atual não usa mais"""
+        with self._lock:
+            manifest = self._snapshots.get(kind)
+        if manifest is None:
+            return
+        try:
+            if kind == "ledger":
+                ledger.prune_snapshot(manifest, self.snapshot_dir)
+            else:
+                faturas.prune_pieces(manifest, self.cache_dir)
+        except OSError:
+            logger.exception("Falha ao limpar o cache de %s", kind)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            if self._wake.wait(self.interval) and not self._stop.is_set():
+                # Deixa terminar a cópia que disparou o evento
+                self._stop.wait(SETTLE_DELAY)
+            self._wake.clear()
@@ -1,10 +1,11 @@
-import pandas as pd
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from datetime import datetime, timedelta
-import numpy as np
+
+from finance import currency, data, ledger, perfil
+
+# Time spent in each stage of this run (sidebar panel with FINANCE_TIMINGS=1)
+perfil.start(__file__)
 
 st.set_page_config(
     page_title="Análise dos Últimos 3 Meses",
@@ -12,18 +13,15 @@ st.set_page_config(
     layout="wide"
 )
 
-@st.cache_resource(show_spinner="Carregando dados...", ttl=3600)
-def load_excel_data():
-    return pd.ExcelFile("data/data.xlsx")
-
 # Load data
-excel_file = load_excel_data()
-if excel_file is not None:
-    year_from_excel = excel_file.sheet_names
-    df_years = [
-        year for year in year_from_excel if any(str(num).isdigit() for num in year)
-    ]
-
+perfil.switch("carregar")
+snapshot = data.ledger_snapshot()
+if snapshot is not None:
+    ledger_df = data.load_ledger_frame(snapshot["version"], snapshot)
+    kpi_table = data.load_kpi_table(snapshot["version"], snapshot)
+    df_years = ledger.period_names(snapshot)
+
+perfil.switch("transformar")
 # Sidebar for month selection
 st.sidebar.title("📅 Seleção de Período")
 st.sidebar.markdown("---")
@@ -66,31 +64,18 @@ st.markdown("---")
 
 st.subheader(f"📅 Período Analisado: {last_3_months[0]} a {last_3_months[-1]}")
 
-# Load data for all 3 months
-monthly_data = {}
-for month in last_3_months:
-    monthly_data[month] = pd.read_excel(excel_file, sheet_name=month)
-
-# Calculate summary metrics for each month
-summary_data = []
-for month in last_3_months:
-    df = monthly_data[month]
-    income = df["Rendimento"].sum()
-    expenses = df[df["Valor"].notna()]["Valor"].sum()
-    paid_bills = df[df["Pago"] == "Sim"]["Valor"].sum()
-    savings = income - expenses
-    savings_rate = (savings / income * 100) if income > 0 else 0
-    
-    summary_data.append({
-        'Mês': month,
-        'Renda': income,
-        'Despesas': expenses,
-        'Bills Pagas': paid_bills,
-        'Economia': savings,
-        'Taxa de Economia (%)': savings_rate
-    })
-
-summary_df = pd.DataFrame(summary_data)
+# Data for all 3 months, taken from the already loaded ledger frame
+period_df = ledger_df[ledger_df["Periodo"].isin(last_3_months)]
+
+perfil.switch("agregar")
+# Summary metrics for each month come straight from the shared KPI table
+monthly_kpis = kpi_table.loc[last_3_months]
+summary_df = (
+    monthly_kpis[['Renda', 'Despesa', 'Bills Pagas', 'Economia', 'Taxa de Economia (%)']]
+    .rename(columns={'Despesa': 'Despesas'})
+    .rename_axis('Mês')
+    .reset_index()
+)
 
 # Key Metrics Section
 st.subheader("🎯 Métricas Principais")
@@ -109,6 +94,7 @@ last_month = summary_df.iloc[-1]
 income_trend = ((last_month['Renda'] - first_month['Renda']) / first_month['Renda'] * 100) if first_month['Renda'] > 0 else 0
 expense_trend = ((last_month['Despesas'] - first_month['Despesas']) / first_month['Despesas'] * 100) if first_month['Despesas'] > 0 else 0
 
+perfil.switch("renderizar")
 # Display metrics in columns
 col1, col2, col3, col4 = st.columns(4)
 
@@ -152,33 +138,41 @@ with col4:
 st.markdown("---")
 st.subheader("📈 Comparação Mensal")
 
-fig_monthly = go.Figure()
-
-fig_monthly.add_trace(go.Bar(
-    x=summary_df['Mês'],
-    y=summary_df['Renda'],
-    name='Renda',
-    marker_color='#00ff88',
-    text=[f'R$ {val:,.0f}' for val in summary_df['Renda']],
-    textposition='auto'
-))
-
-fig_monthly.add_trace(go.Bar(
-    x=summary_df['Mês'],
-    y=summary_df['Despesas'],
-    name='Despesas',
-    marker_color='#ff6b6b',
-    text=[f'R$ {val:,.0f}' for val in summary_df['Despesas']],
-    textposition='auto'
-))
-
-fig_monthly.update_layout(
-    title='Renda vs Despesas por Mês',
-    barmode='group',
-    height=500,
-    xaxis_title='Mês',
-    yaxis_title='Valor (R$)'
-)
+# Figures are cached by data version and the selected months, so reruns that
+# keep both reuse the figures already built
+months_key = (snapshot["version"], tuple(last_3_months))
+
+def build_fig_monthly():
+    fig_monthly = go.Figure()
+
+    fig_monthly.add_trace(go.Bar(
+        x=summary_df['Mês'],
+        y=summary_df['Renda'],
+        name='Renda',
+        marker_color='#00ff88',
+        text=[f'R$ {val:,.0f}' for val in summary_df['Renda']],
+        textposition='auto'
+    ))
+
+    fig_monthly.add_trace(go.Bar(
+        x=summary_df['Mês'],
+        y=summary_df['Despesas'],
+        name='Despesas',
+        marker_color='#ff6b6b',
+        text=[f'R$ {val:,.0f}' for val in summary_df['Despesas']],
+        textposition='auto'
+    ))
+
+    fig_monthly.update_layout(
+        title='Renda vs Despesas por Mês',
+        barmode='group',
+        height=500,
+        xaxis_title='Mês',
+        yaxis_title='Valor (R$)'
+    )
+    return fig_monthly
+
+fig_monthly = data.figure('recent_monthly', months_key, build_fig_monthly)
 
 st.plotly_chart(fig_monthly, use_container_width=True, help="Gráfico comparativo mostrando renda e despesas para cada mês do período selecionado.")
 
@@ -186,50 +180,58 @@ st.plotly_chart(fig_monthly, use_container_width=True, help="Gráfico comparativ
 col1, col2 = st.columns(2)
 
 with col1:
-    fig_savings = go.Figure()
-    fig_savings.add_trace(go.Scatter(
-        x=summary_df['Mês'],
-        y=summary_df['Economia'],
-        mode='lines+markers',
-        name='Economia',
-        line=dict(color='#4ecdc4', width=4),
-        marker=dict(size=10)
-    ))
+    def build_fig_savings():
+        fig_savings = go.Figure()
+        fig_savings.add_trace(go.Scatter(
+            x=summary_df['Mês'],
+            y=summary_df['Economia'],
+            mode='lines+markers',
+            name='Economia',
+            line=dict(color='#4ecdc4', width=4),
+            marker=dict(size=10)
+        ))
     
-    fig_savings.update_layout(
-        title='Evolução da Economia',
-        height=400,
-        xaxis_title='Mês',
-        yaxis_title='Economia (R$)'
-    )
+        fig_savings.update_layout(
+            title='Evolução da Economia',
+            height=400,
+            xaxis_title='Mês',
+            yaxis_title='Economia (R$)'
+        )
+        return fig_savings
+
+    fig_savings = data.figure('recent_savings', months_key, build_fig_savings)
     
     st.plotly_chart(fig_savings, use_container_width=True, help="Evolução da economia ao longo dos 3 meses. Valores positivos indicam economia, negativos indicam déficit.")
 
 with col2:
-    fig_savings_rate = go.Figure()
-    fig_savings_rate.add_trace(go.Scatter(
-        x=summary_df['Mês'],
-        y=summary_df['Taxa de Economia (%)'],
-        mode='lines+markers',
-        name='Taxa de Economia',
-        line=dict(color='#ffa726', width=4),
-        marker=dict(size=10)
-    ))
+    def build_fig_savings_rate():
+        fig_savings_rate = go.Figure()
+        fig_savings_rate.add_trace(go.Scatter(
+            x=summary_df['Mês'],
+            y=summary_df['Taxa de Economia (%)'],
+            mode='lines+markers',
+            name='Taxa de Economia',
+            line=dict(color='#ffa726', width=4),
+            marker=dict(size=10)
+        ))
     
-    # Add reference line for 20% savings rate
-    fig_savings_rate.add_hline(
-        y=20, 
-        line_dash="dash", 
-        line_color="green",
-        annotation_text="Meta: 20%"
-    )
+        # Add reference line for 20% savings rate
+        fig_savings_rate.add_hline(
+            y=20, 
+            line_dash="dash", 
+            line_color="green",
+            annotation_text="Meta: 20%"
+        )
     
-    fig_savings_rate.update_layout(
-        title='Taxa de Economia por Mês',
-        height=400,
-        xaxis_title='Mês',
-        yaxis_title='Taxa de Economia (%)'
-    )
+        fig_savings_rate.update_layout(
+            title='Taxa de Economia por Mês',
+            height=400,
+            xaxis_title='Mês',
+            yaxis_title='Taxa de Economia (%)'
+        )
+        return fig_savings_rate
+
+    fig_savings_rate = data.figure('recent_savings_rate', months_key, build_fig_savings_rate)
     
     st.plotly_chart(fig_savings_rate, use_container_width=True, help="Taxa de economia como porcentagem da renda. A linha verde representa a meta de 20%.")
 
@@ -238,26 +240,27 @@ st.markdown("---")
 st.subheader("🔍 Análise Detalhada")
 
 # Category Analysis (if available)
-if 'Categoria' in monthly_data[last_3_months[-1]].columns or 'Category' in monthly_data[last_3_months[-1]].columns:
-    category_col = 'Categoria' if 'Categoria' in monthly_data[last_3_months[-1]].columns else 'Category'
+if 'Categoria' in period_df.columns or 'Category' in period_df.columns:
+    category_col = 'Categoria' if 'Categoria' in period_df.columns else 'Category'
     
     # Aggregate expenses by category across all 3 months
-    all_expenses = pd.concat([
-        monthly_data[month][monthly_data[month]['Valor'].notna()][[category_col, 'Valor']]
-        for month in last_3_months
-    ])
+    all_expenses = period_df[period_df['Valor'].notna()][[category_col, 'Valor']]
     
-    category_totals = all_expenses.groupby(category_col)['Valor'].sum().sort_values(ascending=False)
+    category_totals = currency.to_reais(all_expenses.groupby(category_col)['Valor'].sum()).sort_values(ascending=False)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        fig_category = px.pie(
-            values=category_totals.values,
-            names=category_totals.index,
-            title='Despesas por Categoria (3 meses)'
-        )
-        fig_category.update_layout(height=400)
+        def build_fig_category():
+            fig_category = px.pie(
+                values=category_totals.values,
+                names=category_totals.index,
+                title='Despesas por Categoria (3 meses)'
+            )
+            fig_category.update_layout(height=400)
+            return fig_category
+
+        fig_category = data.figure('recent_category', months_key, build_fig_category)
         st.plotly_chart(fig_category, use_container_width=True, help="Distribuição das despesas por categoria nos 3 meses analisados.")
     
     with col2:
@@ -276,68 +279,69 @@ if 'Categoria' in monthly_data[last_3_months[-1]].columns or 'Category' in month
 st.markdown("---")
 st.subheader("💳 Análise de Pagamentos")
 
-payment_data = []
-for month in last_3_months:
-    df = monthly_data[month]
-    paid = df[df['Pago'] == 'Sim']['Valor'].sum()
-    unpaid = df[df['Pago'] != 'Sim']['Valor'].sum()
-    payment_data.append({
-        'Mês': month,
-        'Pagas': paid,
-        'Não Pagas': unpaid,
-        'Taxa de Pagamento (%)': (paid / (paid + unpaid) * 100) if (paid + unpaid) > 0 else 0
-    })
-
-payment_df = pd.DataFrame(payment_data)
+payment_df = (
+    monthly_kpis[['Bills Pagas', 'Não Pagas', 'Taxa de Pagamento (%)']]
+    .rename(columns={'Bills Pagas': 'Pagas'})
+    .rename_axis('Mês')
+    .reset_index()
+)
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig_payment_status = go.Figure()
-    fig_payment_status.add_trace(go.Bar(
-        x=payment_df['Mês'],
-        y=payment_df['Pagas'],
-        name='Pagas',
-        marker_color='#00ff88'
-    ))
-    fig_payment_status.add_trace(go.Bar(
-        x=payment_df['Mês'],
-        y=payment_df['Não Pagas'],
-        name='Não Pagas',
-        marker_color='#ff6b6b'
-    ))
+    def build_fig_payment_status():
+        fig_payment_status = go.Figure()
+        fig_payment_status.add_trace(go.Bar(
+            x=payment_df['Mês'],
+            y=payment_df['Pagas'],
+            name='Pagas',
+            marker_color='#00ff88'
+        ))
+        fig_payment_status.add_trace(go.Bar(
+            x=payment_df['Mês'],
+            y=payment_df['Não Pagas'],
+            name='Não Pagas',
+            marker_color='#ff6b6b'
+        ))
     
-    fig_payment_status.update_layout(
-        title='Status dos Pagamentos por Mês',
-        barmode='stack',
-        height=400
-    )
+        fig_payment_status.update_layout(
+            title='Status dos Pagamentos por Mês',
+            barmode='stack',
+            height=400
+        )
+        return fig_payment_status
+
+    fig_payment_status = data.figure('recent_payment_status', months_key, build_fig_payment_status)
     
     st.plotly_chart(fig_payment_status, use_container_width=True, help="Valor das contas pagas vs não pagas por mês. Barras empilhadas mostram o total de despesas.")
 
 with col2:
-    fig_payment_rate = go.Figure()
-    fig_payment_rate.add_trace(go.Scatter(
-        x=payment_df['Mês'],
-        y=payment_df['Taxa de Pagamento (%)'],
-        mode='lines+markers',
-        name='Taxa de Pagamento',
-        line=dict(color='#2196f3', width=4),
-        marker=dict(size=10)
-    ))
+    def build_fig_payment_rate():
+        fig_payment_rate = go.Figure()
+        fig_payment_rate.add_trace(go.Scatter(
+            x=payment_df['Mês'],
+            y=payment_df['Taxa de Pagamento (%)'],
+            mode='lines+markers',
+            name='Taxa de Pagamento',
+            line=dict(color='#2196f3', width=4),
+            marker=dict(size=10)
+        ))
     
-    fig_payment_rate.add_hline(
-        y=90, 
-        line_dash="dash", 
-        line_color="green",
-        annotation_text="Meta: 90%"
-    )
+        fig_payment_rate.add_hline(
+            y=90, 
+            line_dash="dash", 
+            line_color="green",
+            annotation_text="Meta: 90%"
+        )
     
-    fig_payment_rate.update_layout(
-        title='Taxa de Pagamento por Mês',
-        height=400,
-        yaxis_title='Taxa de Pagamento (%)'
-    )
+        fig_payment_rate.update_layout(
+            title='Taxa de Pagamento por Mês',
+            height=400,
+            yaxis_title='Taxa de Pagamento (%)'
+        )
+        return fig_payment_rate
+
+    fig_payment_rate = data.figure('recent_payment_rate', months_key, build_fig_payment_rate)
     
     st.plotly_chart(fig_payment_rate, use_container_width=True, help="Porcentagem de contas pagas em dia por mês. A linha verde representa a meta de 90%.")
 
@@ -388,16 +392,19 @@ with col2:
 st.markdown("---")
 st.subheader("📋 Resumo dos Últimos 3 Meses")
 
-# Format the summary table
-display_df = summary_df.copy()
-display_df['Renda'] = display_df['Renda'].apply(lambda x: f"R$ {x:,.2f}")
-display_df['Despesas'] = display_df['Despesas'].apply(lambda x: f"R$ {x:,.2f}")
-display_df['Bills Pagas'] = display_df['Bills Pagas'].apply(lambda x: f"R$ {x:,.2f}")
-display_df['Economia'] = display_df['Economia'].apply(lambda x: f"R$ {x:,.2f}")
-display_df['Taxa de Economia (%)'] = display_df['Taxa de Economia (%)'].apply(lambda x: f"{x:.1f}%")
+# The summary table rows come from the KPI table already formatted once per data version
+display_df = (
+    data.load_kpi_display(snapshot["version"], snapshot)
+    .loc[last_3_months, ['Renda', 'Despesa', 'Bills Pagas', 'Economia', 'Taxa de Economia (%)']]
+    .rename(columns={'Despesa': 'Despesas'})
+    .rename_axis('Mês')
+    .reset_index()
+)
 
 st.dataframe(display_df, use_container_width=True)
 
 # Footer
 st.markdown("---")
 st.markdown("*Análise gerada automaticamente com base nos dados financeiros dos últimos 3 meses.*")
+
+data.show_timings(perfil.finish())